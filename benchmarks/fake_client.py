@@ -0,0 +1,136 @@
+"""Stand-in for the Riot Client processes (Linux)
+
+Run through launch_command(), the process is started via a symlink named
+after the executable it imitates, so /proc/<pid>/comm and psutil's name()
+look like the real client's and RiotClient finds it by process name. It
+writes the settings YAML, keeps files under 'Riot Client' open and reacts
+to SIGTERM like the real client would (or doesn't, to test the kill path).
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+PR_SET_NAME = 15
+FAKE_PROCESS_NAMES = ['FakeRiotClientServices.exe', 'FakeRiotClientUx.exe']
+SCRIPT_PATH = os.path.abspath(__file__)
+
+SETTINGS_TEMPLATE = """riot-login:
+    persist:
+        session:
+            cookies:
+                - name: "ssid"
+                  value: "fake-session-{pid}"
+username: "{username}"
+"""
+
+def set_process_name(name):
+    """Set /proc/self/comm (Linux keeps the first 15 bytes)"""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None)
+        libc.prctl(PR_SET_NAME, name.encode('utf-8')[:15], 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+def _executable_link(install_dir, name):
+    """A symlink called `name` to this Python, so the kernel names the process after it"""
+    os.makedirs(install_dir, exist_ok=True)
+    link = os.path.join(install_dir, name)
+    if not os.path.islink(link):
+        os.symlink(sys.executable, link)
+    return link
+
+def launch_command(install_dir, config_dir, name=FAKE_PROCESS_NAMES[0], children=FAKE_PROCESS_NAMES[1:],
+                   username=None, on_sigterm='exit', exit_delay=0.2, hold_files=3):
+    """Command line that starts a fake client (for RiotClient.launch_command)"""
+    command = [_executable_link(install_dir, name), SCRIPT_PATH,
+               '--name', name, '--install-dir', install_dir, '--config-dir', config_dir,
+               '--on-sigterm', on_sigterm, '--exit-delay', str(exit_delay), '--hold-files', str(hold_files)]
+    if username:
+        command += ['--username', username]
+    for child in children:
+        command += ['--child', child]
+    return command
+
+def launch(command):
+    """Start a fake client detached from this process's stdio"""
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+class FakeClient:
+    def __init__(self, args):
+        self.args = args
+        self.session_dir = os.path.join(args.config_dir, 'Riot Client')
+        self.held = []
+        self.children = []
+        self.exit_at = None
+
+    def write_settings(self):
+        """Write the settings YAML the way a fresh login does, unless a session was restored"""
+        path = os.path.join(self.session_dir, 'Data', 'RiotGamesPrivateSettings.yaml')
+        if os.path.exists(path) or not self.args.username:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(SETTINGS_TEMPLATE.format(pid=os.getpid(), username=self.args.username))
+
+    def hold_files(self):
+        """Keep log files under 'Riot Client' open, like the client's loggers do"""
+        log_dir = os.path.join(self.session_dir, 'Data', 'Logs')
+        os.makedirs(log_dir, exist_ok=True)
+        for index in range(self.args.hold_files):
+            f = open(os.path.join(log_dir, f'{self.args.name}_{os.getpid()}_{index}.log'), 'a')
+            f.write(f"started {time.time()}\n")
+            f.flush()
+            self.held.append(f)
+
+    def spawn_children(self):
+        for name in self.args.child:
+            command = [_executable_link(self.args.install_dir, name), SCRIPT_PATH,
+                       '--name', name, '--install-dir', self.args.install_dir,
+                       '--config-dir', self.args.config_dir, '--on-sigterm', self.args.on_sigterm,
+                       '--exit-delay', str(self.args.exit_delay), '--hold-files', str(self.args.hold_files)]
+            self.children.append(launch(command))
+
+    def on_sigterm(self, signum, frame):
+        if self.args.on_sigterm == 'ignore' or self.exit_at is not None:
+            return
+        # Flush and close like a real shutdown, after the configured delay
+        self.exit_at = time.monotonic() + self.args.exit_delay
+
+    def run(self):
+        set_process_name(self.args.name)
+        signal.signal(signal.SIGTERM, self.on_sigterm)
+        if self.args.startup_delay:
+            time.sleep(self.args.startup_delay)
+        self.write_settings()
+        self.hold_files()
+        self.spawn_children()
+        while self.exit_at is None or time.monotonic() < self.exit_at:
+            for child in self.children:
+                child.poll()  # reap helpers as they exit so none linger as zombies
+            time.sleep(0.01)
+        for f in self.held:
+            f.close()
+        return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fake_client',
+                                     description='Imitate a Riot Client process for switch benchmarks.')
+    parser.add_argument('--name', default=FAKE_PROCESS_NAMES[0], help='Process name to show')
+    parser.add_argument('--install-dir', required=True, help='Folder for the executable symlinks')
+    parser.add_argument('--config-dir', required=True, help="Folder holding 'Riot Client'")
+    parser.add_argument('--username', help='Identity to write into the settings YAML if none exists')
+    parser.add_argument('--on-sigterm', choices=['exit', 'ignore'], default='exit',
+                        help="'ignore' forces the switcher to kill the process")
+    parser.add_argument('--exit-delay', type=float, default=0.2, help='Seconds between SIGTERM and exit')
+    parser.add_argument('--startup-delay', type=float, default=0.0, help='Seconds before files are opened')
+    parser.add_argument('--hold-files', type=int, default=3, help='Log files to keep open')
+    parser.add_argument('--child', action='append', default=[], help='Helper process to spawn (repeatable)')
+    return FakeClient(parser.parse_args(argv)).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
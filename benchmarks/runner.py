@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from contextlib import redirect_stdout
+
+from core.riot_client import RiotClient
+from benchmarks.tree_gen import generate_riot_tree, touch_session_files, scaled_layout
+from benchmarks import fake_client
+
+READY_TIMEOUT = 5.0
+
+def time_operation(operation, setup=None, warmup=1, repeats=5):
+    """Time operation(i) over warmup + repeats runs; setup(i) runs untimed before each
+
+    Returns a summary dict in milliseconds; warmup runs are not included.
+    """
+    samples = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for i in range(warmup + repeats):
+            if setup:
+                setup(i)
+            start = time.perf_counter()
+            operation(i)
+            elapsed = (time.perf_counter() - start) * 1000
+            if i >= warmup:
+                samples.append(elapsed)
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'stdev_ms': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        'samples_ms': [round(sample, 3) for sample in samples]
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+class BenchmarkEnvironment:
+    """A RiotClient whose config, install and data folders all live in a temp dir"""
+    def __init__(self, root, scale=1.0, backup_format='store', profile=None,
+                 fake_sigterm='exit', fake_exit_delay=0.2):
+        self.root = root
+        self.config_dir = os.path.join(root, 'config')
+        self.layout = scaled_layout(scale)
+        # Fake client names never match a real process, so no benchmark can close a running Riot Client
+        self.client = RiotClient(data_dir=os.path.join(root, 'data'),
+                                 process_names=list(fake_client.FAKE_PROCESS_NAMES))
+        self.client.riot_paths['config'] = self.config_dir
+        self.client.riot_paths['install'] = os.path.join(root, 'install')
+        self.fake_launch_command = fake_client.launch_command(
+            os.path.join(root, 'fake-bin'), self.config_dir,
+            on_sigterm=fake_sigterm, exit_delay=fake_exit_delay
+        )
+        self.client.backup_format = backup_format
+        if profile:
+            self.client.capture_profile = profile
+        self.live_dir = os.path.join(self.config_dir, 'Riot Client')
+        self.accounts = [
+            {'username': 'bench_alice', 'display_name': 'Bench Alice'},
+            {'username': 'bench_bob', 'display_name': 'Bench Bob'}
+        ]
+
+    def generate(self, account_index=0):
+        """(Re)create the live tree as logged in with the given account"""
+        shutil.rmtree(self.live_dir, ignore_errors=True)
+        account = self.accounts[account_index]
+        return generate_riot_tree(self.config_dir, account['username'], self.layout, seed=account_index)
+
+    def prepare_accounts(self):
+        """Give both accounts a saved session backup"""
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for index, account in enumerate(self.accounts):
+                self.generate(index)
+                self.client.backup_account_session(account)
+
+    def settle(self):
+        """Let background work from the previous run finish so it is not timed"""
+        self.client._get_trash().wait()
+        if self.client._sweep_thread is not None:
+            self.client._sweep_thread.join()
+
+    def wait_until_client_ready(self, timeout=READY_TIMEOUT):
+        """Wait for the fake client to run and hold its files; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            running = len(self.client.process_tracker.snapshot(force_rescan=True))
+            if running == len(fake_client.FAKE_PROCESS_NAMES) and self.client._get_session_file_holders():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def backup_path(self, account_index):
+        return self.client._get_account_backup_path(self.accounts[account_index]['display_name'])
+
+def run_benchmarks(env, warmup=1, repeats=5, only=None):
+    """Run every benchmark (or the named ones); returns {name: timing summary}"""
+    client = env.client
+    results = {}
+
+    def wanted(name):
+        return not only or name in only
+
+    env.prepare_accounts()
+
+    if wanted('backup_account_session'):
+        def setup(i):
+            env.settle()
+            touch_session_files(env.live_dir, seed=i)
+        results['backup_account_session'] = time_operation(
+            lambda i: client.backup_account_session(env.accounts[1]), setup, warmup, repeats)
+
+    for mode in ('sync', 'swap', 'replace'):
+        name = f'restore_session_{mode}'
+        if not wanted(name):
+            continue
+        def setup(i):
+            env.settle()
+            touch_session_files(env.live_dir, seed=100 + i)
+        results[name] = time_operation(
+            lambda i, mode=mode: client.restore_session(env.backup_path(0), mode=mode), setup, warmup, repeats)
+
+    if wanted('clear_current_session'):
+        def setup(i):
+            env.settle()
+            env.generate(0)
+        results['clear_current_session'] = time_operation(
+            lambda i: client.clear_current_session(), setup, warmup, repeats)
+
+    if wanted('switch_account'):
+        env.generate(0)
+        def setup(i):
+            env.settle()
+        # Alternate targets so every switch restores a different session
+        results['switch_account'] = time_operation(
+            lambda i: client.switch_account(env.accounts[(i + 1) % 2]), setup, warmup, repeats)
+
+    # The whole switch against fake client processes: terminate, release wait,
+    # pre-switch backup, restore and relaunch
+    if wanted('switch_account_e2e') and sys.platform.startswith('linux'):
+        env.generate(0)
+        client.launch_command = env.fake_launch_command
+        try:
+            client.start_riot_client()
+            def setup(i):
+                env.settle()
+                if not env.wait_until_client_ready():
+                    raise RuntimeError("Fake Riot Client did not start")
+            results['switch_account_e2e'] = time_operation(
+                lambda i: client.switch_account(env.accounts[(i + 1) % 2]), setup, warmup, repeats)
+        finally:
+            env.wait_until_client_ready()
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                client.terminate_riot_client()
+            client.launch_command = None
+
+    # What MainWindow.update_riot_status calls on a manual refresh and on a timer tick
+    if wanted('status_refresh'):
+        env.generate(0)
+        def refresh(i):
+            client.is_running(force_rescan=True)
+            if client.is_logged_in():
+                client.get_current_user()
+        def setup(i):
+            env.settle()
+            client._settings_cache.clear()
+        results['status_refresh'] = time_operation(refresh, setup, warmup, repeats)
+
+    if wanted('status_tick'):
+        results['status_tick'] = time_operation(lambda i: client.is_running(), None, warmup, repeats)
+
+    env.settle()
+    return results
+
+BENCHMARK_NAMES = [
+    'backup_account_session', 'restore_session_sync', 'restore_session_swap', 'restore_session_replace',
+    'clear_current_session', 'switch_account', 'switch_account_e2e', 'status_refresh', 'status_tick'
+]
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return (name, baseline median, current median) for every benchmark slower than tolerance allows"""
+    regressions = []
+    for name, summary in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous and summary['median_ms'] > previous['median_ms'] * tolerance:
+            regressions.append((name, previous['median_ms'], summary['median_ms']))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Time session backup, restore, clear, switch and status checks on a synthetic Riot Client tree.'
+    )
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the file counts of the generated tree (default: 1.0)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per benchmark (default: 1)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per benchmark (default: 5)')
+    parser.add_argument('--format', choices=['store', 'archive'], default='store',
+                        help='Account backup format to benchmark (default: store)')
+    parser.add_argument('--profile', default=None, help='Capture profile for backups (default: the client default)')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARK_NAMES, help='Run only these benchmarks')
+    parser.add_argument('--fake-sigterm', choices=['exit', 'ignore'], default='exit',
+                        help="How the fake client reacts to SIGTERM in switch_account_e2e (default: exit)")
+    parser.add_argument('--fake-exit-delay', type=float, default=0.2,
+                        help='Seconds the fake client takes to exit after SIGTERM (default: 0.2)')
+    parser.add_argument('--baseline', help='Earlier JSON results; exit with status 1 if a benchmark regressed')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='Allowed median slowdown against --baseline (default: 1.25)')
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary directory for inspection')
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='riot-switcher-bench-')
+    try:
+        env = BenchmarkEnvironment(root, args.scale, args.format, args.profile,
+                                   args.fake_sigterm, args.fake_exit_delay)
+        _, tree_stats = env.generate(0)
+        started = time.time()
+        results = run_benchmarks(env, args.warmup, args.repeats, args.only)
+        report = {
+            'meta': {
+                'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                'git_revision': _git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'params': {
+                'scale': args.scale,
+                'warmup': args.warmup,
+                'repeats': args.repeats,
+                'backup_format': args.format,
+                'capture_profile': env.client.capture_profile,
+                'fake_sigterm': args.fake_sigterm,
+                'fake_exit_delay': args.fake_exit_delay,
+                'tree_files': tree_stats['files'],
+                'tree_bytes': tree_stats['bytes']
+            },
+            'results': results
+        }
+    finally:
+        if args.keep:
+            print(f"Benchmark files kept in {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report['results'], baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"Regression: {name} median {before} ms -> {after} ms", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,91 @@
+import os
+import json
+import random
+
+# area -> (relative directory, file count, file size in bytes). Counts and
+# sizes roughly follow a Riot Client folder after a few weeks of use.
+DEFAULT_LAYOUT = {
+    'logs': ('Data/Logs', 400, 24 * 1024),
+    'cache': ('Data/Cache', 600, 16 * 1024),
+    'crash': ('Data/CrashReporting', 20, 64 * 1024),
+    'rso': ('RSOData', 6, 2 * 1024),
+    'auth': ('Plugins/Authentication', 12, 4 * 1024),
+    'plugins': ('Plugins/rcp-fe-common-libs', 80, 48 * 1024),
+    'local_storage': ('LocalStorage/leveldb', 30, 8 * 1024),
+    'session_storage': ('sessionStorage', 4, 1024)
+}
+
+SETTINGS_TEMPLATE = """install:
+    globals:
+        locale: "en_US"
+        region: "NA"
+rso_auth:
+    authorization:
+        access_token_expiry: {expiry}
+riot-login:
+    persist:
+        region: "NA"
+        session:
+            cookies:
+                - domain: "auth.riotgames.com"
+                  name: "ssid"
+                  value: "{token}"
+username: "{username}"
+"""
+
+def scaled_layout(scale=1.0, layout=None):
+    """Return a copy of the layout with every file count multiplied by scale"""
+    layout = layout or DEFAULT_LAYOUT
+    return {area: (rel_dir, max(1, int(count * scale)), size)
+            for area, (rel_dir, count, size) in layout.items()}
+
+def generate_riot_tree(config_dir, username='benchmark_user', layout=None, seed=0):
+    """Write a fake 'Riot Client' folder under config_dir; returns its path and stats
+
+    The tree holds both settings YAMLs (with username as the identity the
+    client looks for), RiotClientInstalls.json and the areas in the layout.
+    File content is random so the object store cannot deduplicate it away,
+    and the same seed always produces the same tree.
+    """
+    rng = random.Random(seed)
+    root = os.path.join(config_dir, 'Riot Client')
+    stats = {'files': 0, 'bytes': 0}
+
+    def write(rel_path, data):
+        path = os.path.join(root, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        stats['files'] += 1
+        stats['bytes'] += len(data)
+
+    settings = SETTINGS_TEMPLATE.format(
+        expiry=1700000000 + seed,
+        token='%032x' % rng.getrandbits(128),
+        username=username
+    ).encode('utf-8')
+    write('RiotGamesPrivateSettings.yaml', settings)
+    write('Data/RiotClientPrivateSettings.yaml', settings)
+    write('Data/RiotClientInstalls.json', json.dumps({
+        'rc_default': 'C:/Riot Games/Riot Client/RiotClientServices.exe',
+        'associated_client': {}
+    }).encode('utf-8'))
+
+    for area, (rel_dir, count, size) in (layout or DEFAULT_LAYOUT).items():
+        for index in range(count):
+            write(f'{rel_dir}/{area}_{index:05d}.dat', rng.getrandbits(size * 8).to_bytes(size, 'little'))
+    return root, stats
+
+def touch_session_files(root, count=5, seed=0):
+    """Rewrite a few session files so the next backup/restore has real work to do"""
+    rng = random.Random(seed)
+    changed = 0
+    for rel_dir in ('RSOData', 'Plugins/Authentication', 'LocalStorage/leveldb'):
+        directory = os.path.join(root, *rel_dir.split('/'))
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory))[:count]:
+            with open(os.path.join(directory, name), 'r+b') as f:
+                f.write(b'%016x' % rng.getrandbits(64))
+            changed += 1
+    return changed
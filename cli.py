@@ -0,0 +1,217 @@
+import os
+import sys
+import json
+import shlex
+import signal
+import argparse
+import threading
+from contextlib import redirect_stdout
+from core.account_manager import AccountManager
+from core.riot_client import RiotClient
+from core.switch_scheduler import SwitchScheduler
+from core.control_server import ControlServer, RpcError, make_handlers, default_address, call, UNKNOWN_ACCOUNT
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_UNKNOWN_ACCOUNT = 2
+
+def open_backend():
+    """The account database and Riot client, wired up like the GUI does it"""
+    account_manager = AccountManager()
+    riot_client = RiotClient(session_index=account_manager)
+    # A switch the app died in the middle of is settled first; its messages
+    # go to stderr so --json output stays parseable
+    with redirect_stdout(sys.stderr):
+        riot_client.recover_interrupted_switch()
+    if account_manager.sessions_index_created:
+        riot_client.rebuild_session_index()
+    return account_manager, riot_client
+
+def format_result(command, result):
+    """Plain-text rendering of a command result"""
+    if command == 'list':
+        if not result:
+            return "No accounts saved"
+        lines = []
+        for account in result:
+            marker = "✅" if account['has_session'] else "⚠️ "
+            lines.append(f"{marker} {account['display_name']} ({account['username']})")
+        return "\n".join(lines)
+    if command == 'status':
+        if result['running']:
+            state = f"Riot Client running ({', '.join(result['processes'])})"
+        else:
+            state = "Riot Client not running"
+        return f"{state}\n{result['current_user'] or 'Not logged in'}"
+    if command == 'switch':
+        if result.get('queued'):
+            return f"⏳ Switch to {result['account']} queued"
+        if not result['ok']:
+            return f"❌ Switch to {result['account']} {result['status'].replace('_', ' ')}"
+        lines = [f"✅ Switched to {result['account']}"]
+        trace = result['breakdown']
+        if trace:
+            phases = ", ".join(f"{span['name']} {round(span['duration_ms'])} ms"
+                               for span in trace['spans'] if span['depth'] == 1)
+            lines.append(f"   {round(trace['duration_ms'])} ms total: {phases}")
+        return "\n".join(lines)
+    if command == 'backup':
+        if not result['ok']:
+            return f"❌ Backup for {result['account']} failed"
+        return (f"✅ Session backed up for {result['account']}: {result['files']} files, "
+                f"{round(result['bytes'] / 1024, 1)} KB ('{result['profile']}' profile)")
+    if command == 'logout':
+        return "✅ Logged out" if result['ok'] else "❌ Logout failed"
+    if command == 'cancel':
+        return f"Cancelled {result['cancelled']} switch request(s)"
+    if command == 'metrics':
+        wait, run = result['wait_ms'], result['run_ms']
+        return (f"{result['in_flight']} running, {result['queue_depth']} queued; "
+                f"{result['requested']} requested, {result['coalesced']} coalesced, {result['done']} done, "
+                f"{result['failed'] + result['error']} failed, {result['cancelled']} cancelled "
+                f"({result['preempted']} preempted), {result['timed_out']} timed out\n"
+                f"wait ms mean {wait['mean']} max {wait['max']}; run ms mean {run['mean']} max {run['max']}")
+    return json.dumps(result)
+
+def exit_code_for(result):
+    if isinstance(result, dict) and result.get('ok') is False:
+        return EXIT_FAILED
+    return EXIT_OK
+
+def command_params(args):
+    """The control method parameters for parsed command-line arguments"""
+    params = {}
+    for name in ('account', 'format', 'profile', 'timeout', 'wait'):
+        if getattr(args, name, None) is not None:
+            params[name] = getattr(args, name)
+    return params
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='riot-switcher',
+        description="Switch Riot accounts from the command line (no GUI needed)."
+    )
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--verbose', '-v', action='store_true', help='show the switcher\'s progress messages')
+    parser.add_argument('--remote', action='store_true',
+                        help='send the command to the running app or `serve` instead of opening the database')
+    parser.add_argument('--address', help='control socket (named pipe on Windows) for --remote and serve')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='list saved accounts')
+    commands.add_parser('status', help='show whether Riot Client runs and who is logged in')
+    switch = commands.add_parser('switch', help='switch to an account')
+    switch.add_argument('account', help='display name or username')
+    switch.add_argument('--timeout', type=float, help='cancel the switch if it runs longer (seconds)')
+    switch.add_argument('--no-wait', dest='wait', action='store_false',
+                        help='return once the switch is queued (with --remote)')
+    backup = commands.add_parser('backup', help="back up the current session for an account")
+    backup.add_argument('account', help='display name or username')
+    backup.add_argument('--format', choices=['store', 'archive'], help='backup format')
+    backup.add_argument('--profile', help="capture profile (e.g. 'minimal', 'lean', 'full')")
+    commands.add_parser('logout', help='close Riot Client and clear the current session')
+    commands.add_parser('cancel', help='cancel the running and queued switch (with --remote)')
+    commands.add_parser('metrics', help='switch queue depth, wait times and outcome counts (with --remote)')
+    commands.add_parser('daemon', help='keep running and read commands from stdin, one per line')
+    commands.add_parser('serve', help='keep running and answer JSON-RPC requests on the control socket')
+    return parser
+
+def run_command(args, handlers):
+    """Run one parsed command; returns (exit code, result or error message)"""
+    # RiotClient reports progress with print(); stdout is kept for results
+    with open(os.devnull, 'w') as devnull, redirect_stdout(sys.stderr if args.verbose else devnull):
+        try:
+            result = handlers[args.command](command_params(args))
+        except RpcError as e:
+            return EXIT_UNKNOWN_ACCOUNT if e.code == UNKNOWN_ACCOUNT else EXIT_FAILED, str(e)
+    return exit_code_for(result), result
+
+def run_remote(args):
+    """Run one command on the running app or server"""
+    address = args.address or default_address(os.getcwd())
+    try:
+        result = call(address, args.command, command_params(args))
+    except RpcError as e:
+        return EXIT_UNKNOWN_ACCOUNT if e.code == UNKNOWN_ACCOUNT else EXIT_FAILED, str(e)
+    except OSError as e:
+        return EXIT_FAILED, f"Nothing is listening on {address}: {e}"
+    return exit_code_for(result), result
+
+def run_server(handlers, address):
+    """Serve the control socket until interrupted"""
+    server = ControlServer(handlers, address)
+    server.start()
+    print(f"Listening on {address} (Ctrl+C to stop)", file=sys.stderr)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    try:
+        while not stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    return EXIT_OK
+
+def run_daemon(parser, handlers, stdin=None, stdout=None):
+    """Answer one command per input line with one JSON line, keeping the backend warm
+
+    Lines use the normal command syntax (e.g. 'switch "Main Account"').
+    Every response is {"command", "exit_code", "result"} or {"error"};
+    'quit' or end of input stops the daemon.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line in ('quit', 'exit'):
+            break
+        try:
+            args = parser.parse_args(shlex.split(line))
+        except (SystemExit, ValueError):  # argparse exits on bad input; the daemon must not
+            response = {'error': f"Invalid command: {line}"}
+        else:
+            if args.command in ('daemon', 'serve'):
+                response = {'error': "Already running as a daemon"}
+            else:
+                exit_code, result = run_command(args, handlers)
+                response = {'command': args.command, 'exit_code': exit_code, 'result': result}
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
+    return EXIT_OK
+
+def print_result(args, exit_code, result):
+    """Print a command's result (errors go to stderr); returns the exit code"""
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif isinstance(result, str):
+        print(result, file=sys.stderr)
+    else:
+        print(format_result(args.command, result))
+    return exit_code
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.remote and args.command not in ('daemon', 'serve'):
+        exit_code, result = run_remote(args)
+        return print_result(args, exit_code, result)
+
+    account_manager, riot_client = open_backend()
+    scheduler = SwitchScheduler(riot_client, account_manager)
+    handlers = make_handlers(account_manager, riot_client, scheduler=scheduler)
+    try:
+        if args.command == 'daemon':
+            return run_daemon(parser, handlers)
+        if args.command == 'serve':
+            return run_server(handlers, args.address or default_address(riot_client.data_dir))
+        exit_code, result = run_command(args, handlers)
+        return print_result(args, exit_code, result)
+    finally:
+        # A switch queued with --no-wait finishes before the database closes
+        scheduler.stop()
+        account_manager.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,70 @@
 import sqlite3
 import os
 import uuid
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from cryptography.fernet import Fernet
 
 class AccountManager:
     def __init__(self, db_path="accounts.db"):
         self.db_path = db_path
-        self.key = self._get_or_create_key()
-        self.cipher = Fernet(self.key)
+        self._cipher = None  # built on first use, listing accounts never needs it
+        
+        # One long-lived connection shared by every thread, serialized by a lock
+        self._lock = threading.RLock()
+        self._transaction_depth = 0
+        self.conn = self._connect()
         self.init_database()
         
+    def _connect(self):
+        """Open the shared connection in WAL mode with a statement cache"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,  # transactions are managed by transaction()
+            cached_statements=64
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+        
+    @contextmanager
+    def transaction(self):
+        """Run several operations in one transaction with a single commit
+        
+        Nested uses join the outermost transaction. Any exception rolls the
+        whole transaction back.
+        """
+        with self._lock:
+            if self._transaction_depth == 0:
+                self.conn.execute('BEGIN')
+            self._transaction_depth += 1
+            try:
+                yield self.conn
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.conn.execute('ROLLBACK')
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.execute('COMMIT')
+                
+    def close(self):
+        """Close the shared database connection"""
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+        
+    @property
+    def cipher(self):
+        """Fernet cipher for passwords; cryptography and the key file are loaded on first use"""
+        if self._cipher is None:
+            from cryptography.fernet import Fernet
+            self._cipher = Fernet(self._get_or_create_key())
+        return self._cipher
+        
     def _get_or_create_key(self):
         """Get or create encryption key"""
         key_file = "key.key"
@@ -18,6 +72,7 @@ class AccountManager:
             with open(key_file, 'rb') as f:
                 return f.read()
         else:
+            from cryptography.fernet import Fernet
             key = Fernet.generate_key()
             with open(key_file, 'wb') as f:
                 f.write(key)
@@ -25,22 +80,35 @@ class AccountManager:
             
     def init_database(self):
         """Initialize the accounts database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS accounts (
-            id TEXT PRIMARY KEY,
-            username TEXT NOT NULL,
-            password_encrypted BLOB NOT NULL,
-            display_name TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            last_used TEXT
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            # Lets the caller know it should build the sessions index once
+            self.sessions_index_created = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'"
+            ).fetchone() is None
+            
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS accounts (
+                id TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                password_encrypted BLOB NOT NULL,
+                display_name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_used TEXT
+            )
+            ''')
+            
+            # One row per account backup on disk, keyed like the backup folder
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                display_name TEXT PRIMARY KEY,
+                backup_path TEXT NOT NULL,
+                backup_format TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                file_count INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                manifest_hash TEXT
+            )
+            ''')
         
     def add_account(self, username, password, display_name):
         """Add a new account"""
@@ -48,31 +116,21 @@ class AccountManager:
         encrypted_password = self.cipher.encrypt(password.encode())
         created_at = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO accounts (id, username, password_encrypted, display_name, created_at)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (account_id, username, encrypted_password, display_name, created_at))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+            INSERT INTO accounts (id, username, password_encrypted, display_name, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (account_id, username, encrypted_password, display_name, created_at))
         
         return account_id
         
     def get_account(self, account_id):
         """Get account by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT id, username, password_encrypted, display_name, created_at, last_used
-        FROM accounts WHERE id = ?
-        ''', (account_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self._lock:
+            row = self.conn.execute('''
+            SELECT id, username, password_encrypted, display_name, created_at, last_used
+            FROM accounts WHERE id = ?
+            ''', (account_id,)).fetchone()
         
         if row:
             decrypted_password = self.cipher.decrypt(row[2]).decode()
@@ -88,16 +146,13 @@ class AccountManager:
         
     def get_all_accounts(self):
         """Get all accounts (without passwords)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT id, username, display_name, created_at, last_used
-        FROM accounts ORDER BY created_at ASC
-        ''')
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self._lock:
+            rows = self.conn.execute('''
+            SELECT a.id, a.username, a.display_name, a.created_at, a.last_used,
+                   s.display_name IS NOT NULL, s.size_bytes, s.created_at
+            FROM accounts a LEFT JOIN sessions s ON s.display_name = a.display_name
+            ORDER BY a.created_at ASC
+            ''').fetchall()
         
         accounts = []
         for row in rows:
@@ -106,7 +161,10 @@ class AccountManager:
                 'username': row[1],
                 'display_name': row[2],
                 'created_at': row[3],
-                'last_used': row[4]
+                'last_used': row[4],
+                'has_session': bool(row[5]),
+                'session_size': row[6],
+                'session_created': row[7]
             })
         return accounts
         
@@ -114,38 +172,60 @@ class AccountManager:
         """Update an existing account"""
         encrypted_password = self.cipher.encrypt(password.encode())
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        UPDATE accounts 
-        SET username = ?, password_encrypted = ?, display_name = ?
-        WHERE id = ?
-        ''', (username, encrypted_password, display_name, account_id))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+            UPDATE accounts 
+            SET username = ?, password_encrypted = ?, display_name = ?
+            WHERE id = ?
+            ''', (username, encrypted_password, display_name, account_id))
         
     def delete_account(self, account_id):
         """Delete an account"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
         
     def mark_account_used(self, account_id):
         """Mark an account as recently used"""
         last_used = datetime.now().isoformat()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        UPDATE accounts SET last_used = ? WHERE id = ?
-        ''', (last_used, account_id))
+        with self.transaction() as conn:
+            conn.execute('''
+            UPDATE accounts SET last_used = ? WHERE id = ?
+            ''', (last_used, account_id))
+        
+    def record_session(self, display_name, backup_path, backup_format, size_bytes, file_count,
+                       manifest_hash=None, created_at=None):
+        """Insert or update the index row for an account's session backup"""
+        created_at = created_at or datetime.now().isoformat()
+        
+        with self.transaction() as conn:
+            conn.execute('''
+            INSERT OR REPLACE INTO sessions
+                (display_name, backup_path, backup_format, size_bytes, file_count, created_at, manifest_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (display_name, backup_path, backup_format, size_bytes, file_count, created_at, manifest_hash))
+            
+    def delete_session(self, display_name):
+        """Remove the index row for an account's session backup"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM sessions WHERE display_name = ?', (display_name,))
+            
+    def get_session(self, display_name):
+        """Get the indexed session backup for a display name"""
+        with self._lock:
+            row = self.conn.execute('''
+            SELECT display_name, backup_path, backup_format, size_bytes, file_count, created_at, manifest_hash
+            FROM sessions WHERE display_name = ?
+            ''', (display_name,)).fetchone()
         
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        if row:
+            return {
+                'display_name': row[0],
+                'backup_path': row[1],
+                'backup_format': row[2],
+                'size_bytes': row[3],
+                'file_count': row[4],
+                'created_at': row[5],
+                'manifest_hash': row[6]
+            }
+        return None
\ No newline at end of file
@@ -0,0 +1,117 @@
+import fnmatch
+
+DEFAULT_PROFILE = 'minimal'
+# Profile that backups made before capture profiles existed are treated as
+LEGACY_PROFILE = 'full'
+
+class CaptureProfile:
+    """Declarative description of which parts of 'Riot Client' a backup holds
+
+    include lists relative files or directories (None means the whole tree)
+    and exclude holds fnmatch globs matched against every relative path and
+    its parent directories. A restore of a profile's backup only touches
+    paths the profile covers, so everything else in the live tree is kept.
+    """
+    def __init__(self, name, include=None, exclude=(), description=''):
+        self.name = name
+        self.include = tuple(include) if include is not None else None
+        self.exclude = tuple(exclude)
+        self.description = description
+
+    def _excluded(self, rel_path):
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts) + 1):
+            prefix = '/'.join(parts[:depth])
+            if any(fnmatch.fnmatch(prefix, pattern) for pattern in self.exclude):
+                return True
+        return False
+
+    def _included(self, rel_path):
+        if self.include is None:
+            return True
+        return any(rel_path == path or rel_path.startswith(path + '/') for path in self.include)
+
+    def matches(self, rel_path):
+        """True if the file at rel_path is part of this profile"""
+        return self._included(rel_path) and not self._excluded(rel_path)
+
+    def covers_dir(self, rel_dir):
+        """True if rel_dir lies inside the profile (its contents belong to it)"""
+        return self.matches(rel_dir)
+
+    def may_contain(self, rel_dir):
+        """True if walking into rel_dir can find anything for this profile"""
+        if self.include is None:
+            return not self._excluded(rel_dir)
+        if self.covers_dir(rel_dir):
+            return True
+        return any(path.startswith(rel_dir + '/') for path in self.include)
+
+    def select(self, files, dirs):
+        """Filter (files, dirs) sync entries down to this profile
+
+        Directories are kept if the profile covers them or they lead to a
+        kept file, so parent folders such as 'Data' are recreated on restore.
+        """
+        selected = {rel_path: entry for rel_path, entry in files.items() if self.matches(rel_path)}
+        selected_dirs = {rel_dir for rel_dir in dirs if self.covers_dir(rel_dir)}
+        for rel_path in selected:
+            parts = rel_path.split('/')[:-1]
+            for depth in range(1, len(parts) + 1):
+                selected_dirs.add('/'.join(parts[:depth]))
+        return selected, selected_dirs
+
+
+PROFILES = {
+    # Only what carries the 'Stay logged in' session
+    'minimal': CaptureProfile(
+        'minimal',
+        include=(
+            'RiotGamesPrivateSettings.yaml',
+            'RiotClientPrivateSettings.yaml',
+            'Data/RiotGamesPrivateSettings.yaml',
+            'Data/RiotClientPrivateSettings.yaml',
+            'Data/RiotGamesPrivateSettings.json',
+            'RSOData',
+            'Plugins/Authentication',
+            'Plugins/rcp-fe-lol-auth',
+            'LocalStorage',
+            'sessionStorage'
+        ),
+        exclude=('*.log', '*.tmp', '*.rs-tmp', '*/Cache', '*/Code Cache', '*/GPUCache'),
+        description='Settings YAMLs, RSOData, auth plugins, LocalStorage and sessionStorage'
+    ),
+    # Everything except logs, caches and crash dumps
+    'lean': CaptureProfile(
+        'lean',
+        exclude=('Data/Logs', 'Data/Cache', 'Data/CrashReporting', 'Logs',
+                 '*.log', '*.tmp', '*.rs-tmp', '*/Cache', '*/Code Cache', '*/GPUCache'),
+        description='The whole Riot Client folder without logs, caches and crash reports'
+    ),
+    # The whole 'Riot Client' folder, as backups were taken originally
+    'full': CaptureProfile(
+        'full',
+        description='The whole Riot Client folder'
+    )
+}
+
+def get_profile(name):
+    """Look up a capture profile by name (None gives the default profile)"""
+    name = name or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown capture profile: {name}") from None
+
+def profile_usage(files):
+    """Return {profile name: (bytes, files)} that each profile would capture from the given entries"""
+    usage = {}
+    for name, profile in PROFILES.items():
+        total_bytes = 0
+        total_files = 0
+        for rel_path, entry in files.items():
+            if profile.matches(rel_path):
+                total_bytes += entry.size
+                total_files += 1
+        usage[name] = (total_bytes, total_files)
+    return usage
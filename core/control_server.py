@@ -0,0 +1,419 @@
+"""Local control API: JSON-RPC 2.0 over a Unix domain socket (a named pipe on Windows)
+
+Lets stream decks, hotkey daemons and scripts drive a running app or
+`cli.py serve` without opening the database themselves. On POSIX every
+request and response is one JSON object per line, so any tool that can
+write to a Unix socket works:
+
+    echo '{"jsonrpc": "2.0", "id": 1, "method": "switch", "params": {"account": "Main"}}' \\
+        | socat - UNIX-CONNECT:riot-switcher.sock
+
+On Windows each request is one message on the pipe. Methods: list, status,
+switch, cancel, backup, logout, metrics and ping.
+"""
+import os
+import sys
+import json
+import socket
+import hashlib
+import threading
+from collections import deque
+from core.switch_scheduler import SwitchScheduler
+
+SOCKET_NAME = 'riot-switcher.sock'
+PIPE_PREFIX = '\\\\.\\pipe\\riot-switcher-'
+
+# JSON-RPC 2.0 error codes; -32000 to -32099 are left to the application
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+UNKNOWN_ACCOUNT = -32001
+
+# Backups and logouts run one at a time on the request queue; a request
+# waiting there is replaced by a newer one with the same key. Switches
+# have their own queue in the SwitchScheduler.
+COALESCE_KEYS = {
+    'backup': lambda params: ('backup', params.get('account')),
+    'logout': lambda params: 'logout'
+}
+
+
+class RpcError(Exception):
+    """An error answered to the client as a JSON-RPC error object"""
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def default_address(data_dir):
+    """Socket path (or pipe name) for the app whose data lives in data_dir"""
+    if sys.platform == 'win32':
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(data_dir)).encode('utf-8')).hexdigest()[:12]
+        return PIPE_PREFIX + digest
+    return os.path.join(data_dir, SOCKET_NAME)
+
+def find_account(account_manager, name):
+    """Look an account up by display name or username (case-insensitive)"""
+    wanted = name.casefold()
+    for account in account_manager.get_all_accounts():
+        if wanted in (account['display_name'].casefold(), account['username'].casefold()):
+            return account
+    raise RpcError(UNKNOWN_ACCOUNT, f"No account named '{name}'")
+
+def _account_param(params):
+    account = params.get('account')
+    if not isinstance(account, str) or not account:
+        raise RpcError(INVALID_PARAMS, "'account' (display name or username) is required")
+    return account
+
+def _timeout_param(params):
+    timeout = params.get('timeout')
+    if timeout is None:
+        return None
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+        raise RpcError(INVALID_PARAMS, "'timeout' must be a positive number of seconds")
+    return timeout
+
+def make_handlers(account_manager, riot_client, on_change=None, scheduler=None):
+    """The control methods as {name: handler(params) -> result}
+
+    Switches go through scheduler (a new SwitchScheduler if None; a host
+    that switches itself passes its own). on_change() is called after a
+    backup or logout so a host (the GUI) can refresh; it runs on the
+    thread that handled the request. Hosts learn about switches from the
+    scheduler's listeners.
+    """
+    if scheduler is None:
+        scheduler = SwitchScheduler(riot_client, account_manager)
+
+    def changed():
+        if on_change is not None:
+            on_change()
+
+    def list_accounts(params):
+        return [{
+            'display_name': account['display_name'],
+            'username': account['username'],
+            'has_session': account['has_session'],
+            'session_size': account['session_size'],
+            'last_used': account['last_used']
+        } for account in account_manager.get_all_accounts()]
+
+    def status(params):
+        processes = riot_client.get_running_processes()
+        logged_in = riot_client.is_logged_in()
+        return {
+            'running': bool(processes),
+            'processes': sorted(set(proc['name'] for proc in processes)),
+            'logged_in': logged_in,
+            'current_user': riot_client.get_current_user() if logged_in else None
+        }
+
+    def switch(params):
+        account = find_account(account_manager, _account_param(params))
+        timeout = _timeout_param(params)
+        request = scheduler.request(account, source=params.get('source', 'control'), timeout=timeout)
+        if not params.get('wait', True):
+            return {'queued': True, 'id': request.id, 'account': account['display_name']}
+        return request.wait().to_dict()
+
+    def cancel(params):
+        return {'cancelled': scheduler.cancel()}
+
+    def metrics(params):
+        return scheduler.metrics()
+
+    def backup(params):
+        account = find_account(account_manager, _account_param(params))
+        ok = riot_client.backup_account_session(account, params.get('format'), params.get('profile'))
+        result = {'ok': ok, 'account': account['display_name']}
+        if ok:
+            stats = riot_client.last_backup_stats
+            result.update({'files': stats['files'], 'bytes': stats['bytes'], 'profile': stats['profile']})
+            changed()
+        return result
+
+    def logout(params):
+        ok = riot_client.force_logout()
+        changed()
+        return {'ok': ok}
+
+    def ping(params):
+        return {'pid': os.getpid()}
+
+    return {
+        'list': list_accounts,
+        'status': status,
+        'switch': switch,
+        'cancel': cancel,
+        'backup': backup,
+        'logout': logout,
+        'metrics': metrics,
+        'ping': ping
+    }
+
+
+class _Pending:
+    """A queued request; callers coalesced into it all wait on the same result"""
+    def __init__(self, func, key):
+        self.func = func
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise TimeoutError("Request did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class RequestQueue:
+    """Runs requests one at a time, in order, on a single worker thread
+
+    A request submitted while one with the same key is still waiting (not
+    yet started) takes its place: the older callers get the newer request's
+    result, so a burst of backups of one account writes it only once more.
+    """
+    def __init__(self, name='control-requests'):
+        self.name = name
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._stopped = False
+        self.coalesced = 0
+
+    def submit(self, func, key=None):
+        """Queue func(); returns a handle whose wait() gives its result"""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Request queue is stopped")
+            if key is not None:
+                for pending in self._queue:
+                    if pending.key == key:
+                        pending.func = func
+                        self.coalesced += 1
+                        return pending
+            pending = _Pending(func, key)
+            self._queue.append(pending)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return pending
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                pending = self._queue.popleft()
+            try:
+                pending.result = pending.func()
+            except Exception as e:
+                pending.error = e
+            pending.done.set()
+
+    def stop(self, timeout=None):
+        """Let the queued requests finish, end the worker and wait for it
+
+        Returns False if the worker was still running after timeout seconds.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+
+class ControlServer:
+    """Serve handlers (see make_handlers) as JSON-RPC 2.0 on a local socket
+
+    Reads are answered on the connection's own thread and switches are
+    handed to the SwitchScheduler; methods in COALESCE_KEYS go through one
+    RequestQueue so they never run concurrently. Passing "wait": false in
+    the params of a switch or a queued method answers as soon as the
+    request is queued.
+    """
+    def __init__(self, handlers, address, coalesce_keys=COALESCE_KEYS):
+        self.handlers = handlers
+        self.address = address
+        self.coalesce_keys = coalesce_keys
+        self.queue = RequestQueue()
+        self._listener = None
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Start listening; OSError if the address is taken by a live server"""
+        if sys.platform == 'win32':
+            from multiprocessing.connection import Listener
+            self._listener = Listener(self.address, family='AF_PIPE')
+            serve = self._serve_pipe
+        else:
+            self._listener = self._bind_unix()
+            serve = self._serve_unix
+        self._thread = threading.Thread(target=serve, name='control-server', daemon=True)
+        self._thread.start()
+
+    def _bind_unix(self):
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                listener.bind(self.address)
+            except OSError:
+                # A socket file left by a crashed instance refuses connections
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(self.address)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    os.unlink(self.address)
+                    listener.bind(self.address)
+                else:
+                    raise OSError(f"Another instance is already listening on {self.address}")
+                finally:
+                    probe.close()
+            os.chmod(self.address, 0o600)  # only this user may switch accounts
+            listener.listen(16)
+        except BaseException:
+            listener.close()
+            raise
+        return listener
+
+    def stop(self):
+        """Stop accepting connections and remove the socket"""
+        if self._listener is None:
+            return
+        self._stopping = True
+        # accept() is not interrupted by close() on every platform; a last
+        # connection wakes it up
+        try:
+            if sys.platform == 'win32':
+                from multiprocessing.connection import Client
+                Client(self.address, family='AF_PIPE').close()
+            else:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as wake:
+                    wake.connect(self.address)
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._listener.close()
+        self._listener = None
+        if sys.platform != 'win32':
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        self.queue.stop()
+
+    def _serve_unix(self):
+        while True:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            if self._stopping:
+                conn.close()
+                return
+            threading.Thread(target=self._handle_stream, args=(conn,), daemon=True).start()
+
+    def _handle_stream(self, conn):
+        try:
+            with conn, conn.makefile('rb') as reader:
+                for line in reader:
+                    if not line.strip():
+                        continue
+                    conn.sendall(json.dumps(self.handle(line)).encode('utf-8') + b'\n')
+        except OSError:
+            pass  # the client went away
+
+    def _serve_pipe(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            if self._stopping:
+                conn.close()
+                return
+            threading.Thread(target=self._handle_pipe, args=(conn,), daemon=True).start()
+
+    def _handle_pipe(self, conn):
+        try:
+            with conn:
+                while True:
+                    conn.send_bytes(json.dumps(self.handle(conn.recv_bytes())).encode('utf-8'))
+        except (EOFError, OSError):
+            pass
+
+    def handle(self, raw):
+        """Answer one raw JSON-RPC request with a response dict"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                raise RpcError(PARSE_ERROR, "Parse error")
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RpcError(INVALID_REQUEST, "Invalid request")
+            request_id = request.get('id')
+            params = request.get('params') or {}
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+            result = self.dispatch(request['method'], params)
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RpcError as e:
+            error = {'code': e.code, 'message': str(e)}
+        except Exception as e:
+            error = {'code': INTERNAL_ERROR, 'message': f"{type(e).__name__}: {e}"}
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': error}
+
+    def dispatch(self, method, params):
+        handler = self.handlers.get(method)
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Unknown method '{method}'")
+        if method not in self.coalesce_keys:
+            return handler(params)
+        params = dict(params)
+        wait = params.pop('wait', True)
+        pending = self.queue.submit(lambda: handler(params), self.coalesce_keys[method](params))
+        if not wait:
+            return {'queued': True}
+        return pending.wait()
+
+
+def call(address, method, params=None, timeout=None):
+    """Send one request to a running ControlServer and return its result
+
+    Raises RpcError for an error response and OSError if nothing listens.
+    """
+    request = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params or {}}).encode('utf-8')
+    if sys.platform == 'win32':
+        from multiprocessing.connection import Client
+        with Client(address, family='AF_PIPE') as conn:
+            conn.send_bytes(request)
+            response = json.loads(conn.recv_bytes())
+    else:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(address)
+            conn.sendall(request + b'\n')
+            with conn.makefile('rb') as reader:
+                response = json.loads(reader.readline())
+    if 'error' in response:
+        raise RpcError(response['error']['code'], response['error']['message'])
+    return response['result']
@@ -0,0 +1,135 @@
+import os
+import json
+import uuid
+
+SIZE_CACHE_DIR = '.size_cache'
+DEFAULT_WORKERS = 4
+
+def _scan(path):
+    """Recursively total (bytes, files) with one DirEntry.stat per file"""
+    total_bytes = 0
+    total_files = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total_bytes += entry.stat(follow_symlinks=False).st_size
+                            total_files += 1
+                    except OSError:
+                        pass  # vanished while scanning
+        except OSError:
+            pass
+    return total_bytes, total_files
+
+def directory_size(path, workers=DEFAULT_WORKERS):
+    """Return (bytes, files) for a tree, fanning top-level subtrees out over threads"""
+    total_bytes = 0
+    total_files = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total_bytes += entry.stat(follow_symlinks=False).st_size
+                        total_files += 1
+                except OSError:
+                    pass
+    except OSError:
+        return 0, 0
+
+    if workers > 1 and len(subdirs) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(workers, len(subdirs))) as pool:
+            results = list(pool.map(_scan, subdirs))
+    else:
+        results = [_scan(subdir) for subdir in subdirs]
+    for subdir_bytes, subdir_files in results:
+        total_bytes += subdir_bytes
+        total_files += subdir_files
+    return total_bytes, total_files
+
+def _tree_signature(path):
+    """Cheap change marker: mtimes of the directory and its immediate children
+
+    Backups are written once and replaced by renaming, and every add/remove
+    of a file bumps its parent directory's mtime, so this changes whenever
+    the backup does without walking the tree.
+    """
+    st = os.stat(path)
+    children = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                child = entry.stat(follow_symlinks=False)
+                children.append([entry.name, child.st_mtime_ns, child.st_size])
+            except OSError:
+                pass
+    children.sort()
+    return [st.st_mtime_ns, children]
+
+def _cache_path(path):
+    """Size caches live beside the tree (in a hidden folder), never inside it"""
+    parent, name = os.path.split(os.path.normpath(path))
+    return os.path.join(parent, SIZE_CACHE_DIR, name + '.json')
+
+def cached_directory_size(path, workers=DEFAULT_WORKERS):
+    """directory_size() that is free to repeat until the tree changes"""
+    try:
+        signature = _tree_signature(path)
+    except OSError:
+        return 0, 0
+    cache_path = _cache_path(path)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('signature') == signature:
+            return cached['bytes'], cached['files']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    total_bytes, total_files = directory_size(path, workers)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'bytes': total_bytes, 'files': total_files}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return total_bytes, total_files
+
+def storage_usage(root, workers=DEFAULT_WORKERS):
+    """Per-entry and total usage of a backups folder
+
+    Returns {'total_bytes', 'total_files', 'entries': {name: (bytes, files)}}.
+    Each child folder is sized (and cached) separately, so one new backup only
+    costs a scan of that backup.
+    """
+    usage = {'total_bytes': 0, 'total_files': 0, 'entries': {}}
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return usage
+    for entry in entries:
+        if entry.name == SIZE_CACHE_DIR:
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                size = cached_directory_size(entry.path, workers)
+            else:
+                size = (entry.stat(follow_symlinks=False).st_size, 1)
+        except OSError:
+            continue
+        usage['entries'][entry.name] = size
+        usage['total_bytes'] += size[0]
+        usage['total_files'] += size[1]
+    return usage
@@ -0,0 +1,113 @@
+import os
+import sys
+import errno
+import shutil
+import threading
+
+# _IOW(0x94, 9, int) from linux/fs.h
+FICLONE = 0x40049409
+
+# Errors meaning "this method does not work between these filesystems"
+UNSUPPORTED_ERRORS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS, errno.EPERM}
+if hasattr(errno, 'ENOTSUP'):
+    UNSUPPORTED_ERRORS.add(errno.ENOTSUP)
+
+_clonefile = None
+_methods = {}  # (source st_dev, dest dir st_dev) -> method that worked
+_methods_lock = threading.Lock()
+
+def _load_clonefile():
+    """Look up macOS clonefile(2) once (None where it is unavailable)"""
+    global _clonefile
+    if _clonefile is None:
+        _clonefile = False
+        if sys.platform == 'darwin':
+            try:
+                import ctypes
+                import ctypes.util
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+                func = libc.clonefile
+                func.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+                func.restype = ctypes.c_int
+                _clonefile = (ctypes, func)
+            except (OSError, AttributeError):
+                pass
+    return _clonefile or None
+
+def _candidate_methods():
+    """Clone methods in order of preference; 'copy' always works"""
+    methods = []
+    if sys.platform.startswith('linux'):
+        methods.append('ficlone')
+    if _load_clonefile() is not None:
+        methods.append('clonefile')
+    if hasattr(os, 'copy_file_range'):
+        methods.append('copy_file_range')
+    methods.append('copy')
+    return methods
+
+def _clone_ficlone(src, dest):
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+        fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+
+def _clone_clonefile(src, dest):
+    ctypes, clonefile = _load_clonefile()
+    if os.path.lexists(dest):
+        os.remove(dest)  # clonefile() refuses to overwrite
+    if clonefile(os.fsencode(src), os.fsencode(dest), 0) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), src, None, dest)
+
+def _clone_copy_file_range(src, dest):
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+        if remaining > 0:
+            # File grew or shrank underneath us; let the caller retry with a plain copy
+            raise OSError(errno.EINVAL, "copy_file_range stopped short", src)
+
+def _clone_copy(src, dest):
+    shutil.copyfile(src, dest)
+
+_CLONERS = {
+    'ficlone': _clone_ficlone,
+    'clonefile': _clone_clonefile,
+    'copy_file_range': _clone_copy_file_range,
+    'copy': _clone_copy
+}
+
+def _device_key(src, dest):
+    return (os.stat(src).st_dev, os.stat(os.path.dirname(dest) or '.').st_dev)
+
+def clone_file(src, dest):
+    """Copy src's content to dest as a copy-on-write clone where the filesystem allows
+
+    Tries FICLONE (btrfs, XFS), clonefile (APFS) and copy_file_range (which
+    reflinks or copies in the kernel) before a normal copy. The first method
+    that works is remembered per pair of filesystems, so unsupported ones are
+    only tried once. Like shutil.copyfile only the content is copied.
+    Returns the method that was used.
+    """
+    key = _device_key(src, dest)
+    cached = _methods.get(key)
+    methods = [cached] if cached else _candidate_methods()
+    for method in methods:
+        try:
+            _CLONERS[method](src, dest)
+        except OSError as e:
+            if method == 'copy' or e.errno not in UNSUPPORTED_ERRORS:
+                raise
+            if cached:
+                # Worked before for these filesystems, so this file is the odd one out
+                _clone_copy(src, dest)
+                return 'copy'
+            continue
+        if not cached:
+            with _methods_lock:
+                _methods[key] = method
+        return method
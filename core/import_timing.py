@@ -0,0 +1,50 @@
+import os
+import sys
+import subprocess
+
+# Loaded on first use in core/, so none of them should be in sys.modules at first paint
+DEFERRED_MODULES = ('psutil', 'yaml', 'cryptography', 'concurrent.futures')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_breakdown(module, top=8):
+    """Cold-import `module` in a fresh interpreter with -X importtime
+
+    Returns (total_ms, [(package, ms)]) with the `top` top-level packages
+    that took the longest (their own import time, summed over submodules).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=60)
+    # "import time: self [us] | cumulative | imported package", children
+    # indented below and listed before their parent
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip()) - 1
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+
+    # Only count what `module` pulled in, not the interpreter's own start-up imports
+    end = next((i for i, entry in enumerate(entries) if entry[0] == 0 and entry[1] == module), None)
+    if end is None:
+        return 0.0, []
+    start = end
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    packages = {}
+    for _, name, self_us, _ in entries[start:end + 1]:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total_us = entries[end][3]
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total_us / 1000, [(package, us / 1000) for package, us in heaviest]
+
+def loaded_modules(names=DEFERRED_MODULES):
+    return [name for name in names if name in sys.modules]
+
+def deferred_after_import(module, names=DEFERRED_MODULES):
+    """Which of `names` a fresh interpreter has loaded after importing `module`"""
+    code = f'import sys, {module}; print(",".join(n for n in {tuple(names)!r} if n in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, timeout=60, check=True)
+    return [name for name in result.stdout.strip().split(',') if name]
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_CAPACITY = 20
+MAX_LOG_BYTES = 1024 * 1024
+
+class Span:
+    """One timed phase; fields such as bytes and files are filled in while it runs"""
+    def __init__(self, name, trace, depth, fields):
+        self.name = name
+        self.trace = trace
+        self.depth = depth
+        self.fields = dict(fields)
+        self.start = time.monotonic()
+        self.end = None
+        self.ok = True
+        self.error = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def to_dict(self):
+        origin = self.trace.start if self.trace is not None else self.start
+        event = {
+            'type': 'span',
+            'name': self.name,
+            'trace': self.trace.id if self.trace is not None else None,
+            'depth': self.depth,
+            'start_monotonic': self.start,
+            'end_monotonic': self.end,
+            'offset_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(((self.end or time.monotonic()) - self.start) * 1000, 3),
+            'ok': self.ok
+        }
+        if self.error:
+            event['error'] = self.error
+        event.update(self.fields)
+        return event
+
+
+class Trace(Span):
+    """A whole operation (e.g. one switch) and the spans recorded inside it"""
+    def __init__(self, name, fields):
+        super().__init__(name, None, 0, fields)
+        self.id = uuid.uuid4().hex[:12]
+        self.time = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.spans = []
+
+    def to_dict(self, include_spans=True):
+        event = super().to_dict()
+        event.update({'type': 'trace', 'id': self.id, 'time': self.time, 'span_count': len(self.spans)})
+        del event['trace'], event['depth'], event['offset_ms']
+        if include_spans:
+            event['spans'] = [span.to_dict() for span in self.spans]
+        return event
+
+
+class Instrumentation:
+    """Timing spans for RiotClient's phases
+
+    Every finished span and trace is appended as one JSON object per line to
+    log_path (if given); finished traces are also kept in a ring buffer of
+    the last `capacity` entries for the GUI. Spans opened while a trace is
+    active on the same thread are attached to it.
+    """
+    def __init__(self, log_path=None, capacity=DEFAULT_CAPACITY):
+        self.log_path = log_path
+        self.traces = deque(maxlen=capacity)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _current_trace(self):
+        for item in reversed(self._stack()):
+            if isinstance(item, Trace):
+                return item
+        return None
+
+    @contextmanager
+    def _run(self, record):
+        stack = self._stack()
+        stack.append(record)
+        try:
+            yield record
+        except BaseException as e:
+            record.ok = False
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.end = time.monotonic()
+            stack.pop()
+            self._finish(record)
+
+    def span(self, name, **fields):
+        """Context manager timing one phase; yields the Span so fields can be set"""
+        trace = self._current_trace()
+        return self._run(Span(name, trace, len(self._stack()), fields))
+
+    def trace(self, name, **fields):
+        """Context manager grouping the spans of one operation; yields the Trace"""
+        return self._run(Trace(name, fields))
+
+    def annotate(self, **fields):
+        """Add fields to the innermost open span or trace on this thread"""
+        stack = self._stack()
+        if stack:
+            stack[-1].set(**fields)
+
+    def _finish(self, record):
+        if isinstance(record, Trace):
+            with self._lock:
+                self.traces.append(record)
+            self._write(record.to_dict(include_spans=False))
+        else:
+            if record.trace is not None:
+                record.trace.spans.append(record)
+            self._write(record.to_dict())
+
+    def _write(self, event):
+        if not self.log_path:
+            return
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                    os.replace(self.log_path, self.log_path + '.1')
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event) + '\n')
+        except OSError:
+            pass  # diagnostics must never break a switch
+
+    def last_trace(self, name=None):
+        """The most recent finished trace (optionally of one name) as a dict, or None"""
+        with self._lock:
+            for trace in reversed(self.traces):
+                if name is None or trace.name == name:
+                    return trace.to_dict()
+        return None
+
+
+def phase(name, trace=False):
+    """Decorator recording a method call as a span (or trace) on self.instrumentation
+
+    A return value of False marks the phase as failed; methods can add
+    fields such as bytes or files with self.instrumentation.annotate().
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = getattr(self, 'instrumentation', None)
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            opener = instrumentation.trace if trace else instrumentation.span
+            with opener(name) as record:
+                result = method(self, *args, **kwargs)
+                record.ok = result is not False
+                return result
+        return wrapper
+    return decorator
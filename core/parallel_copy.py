@@ -0,0 +1,79 @@
+import os
+import time
+
+# Per-file copies of small session files are latency bound, not CPU bound
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# Below this many jobs the thread start-up costs more than it saves
+MIN_PARALLEL_JOBS = 16
+
+class ParallelCopier:
+    """Run per-file copy jobs on a bounded thread pool and measure throughput
+
+    Callers walk their tree once and create the directories up front, then
+    hand one job per file to run(). At most `workers` jobs run at a time and
+    only a small window of them is queued, so memory stays flat for large
+    trees.
+    """
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+
+    def run(self, func, items):
+        """Call func(item) for every item
+
+        func returns the number of bytes it copied, or None if the file
+        needed no copy. The first exception raised by a job is re-raised once
+        the jobs in flight have finished. Returns a stats dict (files_copied,
+        bytes_copied, seconds, bytes_per_sec, workers).
+        """
+        items = list(items)
+        started = time.monotonic()
+        results = []
+        if self.workers == 1 or len(items) < MIN_PARALLEL_JOBS:
+            results = [func(item) for item in items]
+            workers = 1
+        else:
+            # Imported here: only trees large enough to go parallel pay for it
+            from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+            workers = self.workers
+            window = workers * 4
+            pending = set()
+            error = None
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for item in items:
+                    if error is not None:
+                        break
+                    pending.add(pool.submit(func, item))
+                    if len(pending) >= window:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        error = self._collect(done, results) or error
+                done, pending = wait(pending)
+                error = self._collect(done, results) or error
+            if error is not None:
+                raise error
+
+        seconds = time.monotonic() - started
+        copied = [result for result in results if result is not None]
+        bytes_copied = sum(copied)
+        return {
+            'files_copied': len(copied),
+            'bytes_copied': bytes_copied,
+            'seconds': seconds,
+            'bytes_per_sec': bytes_copied / seconds if seconds > 0 else 0,
+            'workers': workers
+        }
+
+    def _collect(self, futures, results):
+        error = None
+        for future in futures:
+            if future.exception() is not None:
+                error = error or future.exception()
+            else:
+                results.append(future.result())
+        return error
+
+
+def format_rate(bytes_per_sec):
+    """Human readable throughput, e.g. '12.3 MB/s'"""
+    if bytes_per_sec >= 1024 * 1024:
+        return f"{round(bytes_per_sec / (1024 * 1024), 1)} MB/s"
+    return f"{round(bytes_per_sec / 1024, 1)} KB/s"
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import time
+
+# Linux truncates /proc/<pid>/comm to 15 characters (TASK_COMM_LEN - 1)
+COMM_MAX_LEN = 15
+
+class ProcessTracker:
+    """Shared, cached view of the running Riot processes
+
+    One full scan of the machine finds the Riot processes; later calls only
+    re-check those cached PIDs (create_time guards against PID reuse). A full
+    rescan happens on a slow cadence, when a tracked PID disappears, or when
+    a caller forces it.
+    """
+    def __init__(self, process_names, rescan_interval=15.0):
+        self.process_names = process_names
+        self.rescan_interval = rescan_interval
+        self._tracked = {}  # pid -> psutil.Process (with .info = {'pid', 'name'})
+        self._last_full_scan = None
+        self._lock = threading.Lock()
+        self._use_proc_fs = sys.platform.startswith('linux') and os.path.isdir('/proc')
+
+    def snapshot(self, force_rescan=False):
+        """Return the live Riot processes as psutil.Process objects (one scan per call)"""
+        with self._lock:
+            now = time.monotonic()
+            if (force_rescan or self._last_full_scan is None
+                    or now - self._last_full_scan >= self.rescan_interval
+                    or not self._recheck_tracked()):
+                self._full_scan()
+                self._last_full_scan = now
+            return list(self._tracked.values())
+
+    def invalidate(self):
+        """Forget the cached PIDs so the next snapshot does a full scan"""
+        with self._lock:
+            self._tracked = {}
+            self._last_full_scan = None
+
+    def _recheck_tracked(self):
+        """Re-check only the cached PIDs; False means one of them went away"""
+        import psutil
+        for pid, proc in list(self._tracked.items()):
+            try:
+                # is_running() compares create_time, so a reused PID counts as gone
+                if not proc.is_running() or proc.status() == psutil.STATUS_ZOMBIE:
+                    return False
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return False
+        return True
+
+    def _full_scan(self):
+        """Rebuild the cache from a single scan of the process table"""
+        names = set(self.process_names)
+        tracked = {}
+        if self._use_proc_fs:
+            candidates = self._scan_proc_comm(names)
+        else:
+            candidates = None
+        if candidates == []:
+            # Nothing matched in /proc: Riot is not running and psutil is not needed yet
+            self._tracked = tracked
+            return
+
+        import psutil
+        if candidates is None:
+            for proc in psutil.process_iter(['pid', 'name']):
+                if proc.info['name'] in names:
+                    tracked[proc.pid] = proc
+        else:
+            for pid in candidates:
+                try:
+                    proc = psutil.Process(pid)
+                    name = proc.name()
+                    if name in names:
+                        proc.info = {'pid': pid, 'name': name}
+                        tracked[pid] = proc
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+        self._tracked = tracked
+
+    def _scan_proc_comm(self, names):
+        """Linux fast path: match /proc/*/comm against the (truncated) process names"""
+        prefixes = set(name[:COMM_MAX_LEN] for name in names)
+        candidates = []
+        try:
+            entries = os.listdir('/proc')
+        except OSError:
+            return None
+        for entry in entries:
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/comm', 'rb') as f:
+                    comm = f.read().rstrip(b'\n').decode('utf-8', 'replace')
+            except OSError:
+                continue
+            if comm in prefixes:
+                candidates.append(int(entry))
+        return candidates
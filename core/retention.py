@@ -0,0 +1,117 @@
+import os
+import time
+import shutil
+from core.disk_usage import cached_directory_size
+from core.session_store import MANIFEST_NAME
+
+class RetentionPolicy:
+    """Limits for the pre-switch backups kept under backups/
+
+    keep_last caps the number of backups, max_total_bytes the disk space
+    they use together and max_age_days how long one is kept after it was
+    last used. Any limit can be None to disable it. The min_keep most
+    recently used backups are never removed.
+    """
+    def __init__(self, keep_last=10, max_total_bytes=512 * 1024 * 1024, max_age_days=30, min_keep=1):
+        self.keep_last = keep_last
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self.min_keep = min_keep
+
+
+class _Backup:
+    """One backup under the retention root: a store snapshot or an old raw copy"""
+    def __init__(self, name, path, last_used, objects=None, own_bytes=0):
+        self.name = name
+        self.path = path
+        self.last_used = last_used
+        self.objects = objects or {}  # object hash -> size, for store snapshots
+        self.own_bytes = own_bytes    # bytes not shared with anything (raw copies)
+
+
+def _list_backups(store):
+    backups = []
+    try:
+        names = os.listdir(store.root)
+    except OSError:
+        return backups
+    for name in names:
+        path = os.path.join(store.root, name)
+        if name.startswith('.') or not os.path.isdir(path):
+            continue
+        try:
+            if store.is_snapshot(path):
+                manifest = store.read_manifest(path)
+                objects = {entry['hash']: entry['size'] for entry in manifest['files'].values()}
+                last_used = os.stat(os.path.join(path, MANIFEST_NAME)).st_mtime
+                backups.append(_Backup(name, path, last_used, objects=objects))
+            else:
+                # Full copies made before backups/ became a store
+                backups.append(_Backup(name, path, os.stat(path).st_mtime,
+                                       own_bytes=cached_directory_size(path)[0]))
+        except (OSError, ValueError, KeyError):
+            continue  # half-written or unreadable; leave it alone
+    return backups
+
+
+def select_expired(backups, policy, now=None):
+    """Pick the backups to remove, least recently used first
+
+    The byte budget counts every stored object once, however many snapshots
+    share it, so removing a snapshot only frees the objects nothing else
+    still refers to.
+    """
+    now = time.time() if now is None else now
+    ordered = sorted(backups, key=lambda backup: backup.last_used, reverse=True)
+    protected = ordered[:policy.min_keep]
+    candidates = ordered[policy.min_keep:]
+    expired = []
+    kept = list(protected)
+
+    for index, backup in enumerate(candidates, start=len(protected)):
+        if policy.keep_last is not None and index >= policy.keep_last:
+            expired.append(backup)
+        elif policy.max_age_days is not None and now - backup.last_used > policy.max_age_days * 86400:
+            expired.append(backup)
+        else:
+            kept.append(backup)
+
+    if policy.max_total_bytes is not None:
+        refcounts = {}
+        object_sizes = {}
+        total = 0
+        for backup in kept:
+            total += backup.own_bytes
+            for digest, size in backup.objects.items():
+                if digest not in refcounts:
+                    refcounts[digest] = 0
+                    object_sizes[digest] = size
+                    total += size
+                refcounts[digest] += 1
+        # Evict from the least recently used end until the budget fits
+        for backup in reversed(kept[len(protected):]):
+            if total <= policy.max_total_bytes:
+                break
+            expired.append(backup)
+            total -= backup.own_bytes
+            for digest in backup.objects:
+                refcounts[digest] -= 1
+                if refcounts[digest] == 0:
+                    total -= object_sizes[digest]
+    return expired
+
+
+def apply_retention(store, policy, now=None):
+    """Delete the backups in store.root that the policy no longer allows
+
+    Returns (removed names, bytes freed by collecting unreferenced objects).
+    """
+    removed = []
+    for backup in select_expired(_list_backups(store), policy, now):
+        if store.is_snapshot(backup.path):
+            store.delete_snapshot(backup.path)
+        else:
+            shutil.rmtree(backup.path, ignore_errors=True)
+        removed.append(backup.name)
+    freed = store.gc()
+    return removed, freed
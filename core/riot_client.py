@@ -1,23 +1,133 @@
-import psutil
 import os
-import platform
+import re
 import shutil
-import yaml
 import json
 import time
 import subprocess
+import threading
+import functools
+from core.process_tracker import ProcessTracker
+from core.session_store import SessionStore, MANIFEST_NAME
+from core.session_sync import entries_from_directory, sync_tree, tree_digest, scan_live, remove_extraneous
+from core.session_archive import find_archive, write_archive, sync_from_archive, list_archive, ARCHIVE_BASENAME, COMPRESSIONS
+from core.disk_usage import storage_usage
+from core.session_swap import make_staging_dir, link_tree, swap_in, find_stale_staging_dirs
+from core.parallel_copy import format_rate
+from core.trash import TrashBin, TRASH_DIR_NAME
+from core.instrumentation import Instrumentation, phase
+from core.switch_journal import SwitchJournal, JOURNAL_NAME
+from core.retention import RetentionPolicy, apply_retention
+from core.capture_profiles import get_profile, profile_usage, PROFILES, DEFAULT_PROFILE, LEGACY_PROFILE
+
+# psutil and PyYAML are imported where they are used: a status check with
+# Riot Client closed, or a headless 'list', needs neither of them
+
+def _yaml_safe_loader(yaml):
+    """The libyaml-backed loader when PyYAML was built with it"""
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def exclusive(method):
+    """Run the method holding self.operation_lock
+
+    Switches, account backups and logouts can be started from the GUI and
+    from the control server at once; they must never interleave on the
+    same 'Riot Client' folder.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.operation_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+TOP_LEVEL_SCALAR_PATTERN = re.compile(r'^([^\s#:\'"{\[][^:]*?):[ \t]+([^\s#&*!|>{\[].*?)\s*$')
+IDENTITY_KEY_HINTS = ('user', 'account')  # 'username' is covered by 'user'
+ACCOUNT_INFO_NAME = 'account_info.json'
+# Files and directories under 'Riot Client' to clear for logout
+LOGOUT_TARGETS = (
+    'RiotGamesPrivateSettings.yaml',
+    'RiotClientPrivateSettings.yaml', 
+    'Data/RiotGamesPrivateSettings.yaml',
+    'Data/RiotClientPrivateSettings.yaml',
+    'Data/Cache',
+    'Data/Logs', 
+    'Data/CrashReporting',
+    'Data/RiotClientInstalls.json',
+    'Data/RiotGamesPrivateSettings.json',  # JSON variant
+    'Plugins/Authentication',
+    'Plugins/rcp-fe-lol-auth',
+    'Plugins/rcp-fe-common-libs',
+    'RSOData',  # Riot Single Sign-On data
+    'LocalStorage',  # Browser-like local storage
+    'sessionStorage'  # Session storage
+)
+# Logout targets without account state (the rest is either captured by the
+# restored profile or, like RiotClientInstalls.json, shared by all accounts)
+DISPOSABLE_TARGETS = ('Data/Cache', 'Data/Logs', 'Data/CrashReporting')
+
+
+class SwitchCancelled(Exception):
+    """Raised inside switch_account when the caller cancels between phases"""
+
 
 class RiotClient:
-    def __init__(self):
-        self.system = platform.system()
+    def __init__(self, session_index=None, data_dir=None, process_names=None, launch_command=None):
+        # Same values as platform.system() ('Windows', 'Darwin', 'Linux'), which is slow to import
+        self.system = 'Windows' if os.name == 'nt' else os.uname().sysname
         self.riot_paths = self._get_riot_paths()
-        self.process_names = [
+        # Where backups/ and account_backups/ live (the app's working directory by default)
+        self.data_dir = data_dir or os.getcwd()
+        self.account_store = SessionStore(os.path.join(self.data_dir, 'account_backups'))
+        # Pre-switch safety backups share one store of their own; the
+        # retention policy is applied in the background after each switch
+        self.backup_store = SessionStore(os.path.join(self.data_dir, 'backups'))
+        self.backup_retention = RetentionPolicy()
+        self._sweep_thread = None
+        # 'swap' prepares the session beside the live tree and renames it into
+        # place in one step, 'sync' rewrites only the differing files in place,
+        # 'replace' deletes and recopies everything
+        self.restore_mode = 'swap'
+        self.last_restore_stats = None
+        # 'store' keeps account backups in the deduplicated object store,
+        # 'archive' as one compressed tar per account (see core.session_archive)
+        self.backup_format = 'store'
+        self.archive_compression = None  # None picks zstd if available, else xz
+        # Which part of 'Riot Client' account backups capture (see
+        # core.capture_profiles); 'minimal' keeps only the session files
+        self.capture_profile = DEFAULT_PROFILE
+        self.last_backup_stats = None
+        # 'trash' renames cleared session files into a trash folder that is
+        # purged in the background, 'delete' removes them synchronously
+        self.clear_mode = 'trash'
+        self._trash = None
+        # Threads used to copy session files (None uses core.parallel_copy's default)
+        self.copy_workers = None
+        # Optional AccountManager that keeps the sessions table in step with the backups
+        self.session_index = session_index
+        self.process_names = process_names or [
             'RiotClientServices.exe',
             'RiotClientUx.exe', 
             'RiotClientUxRender.exe',
             'LeagueClient.exe',
             'VALORANT.exe'
         ]
+        # Command list that starts the client; None uses the platform's install path
+        self.launch_command = launch_command
+        self.operation_lock = threading.RLock()  # see exclusive()
+        self.process_tracker = ProcessTracker(self.process_names)
+        # Per-phase timings of every switch, as JSON lines under logs/ and
+        # in memory for the GUI's last switch breakdown
+        self.instrumentation = Instrumentation(os.path.join(self.data_dir, 'logs', 'switch_events.jsonl'))
+        # Write-ahead log of the switch in progress (see recover_interrupted_switch)
+        self.journal = SwitchJournal(os.path.join(self.data_dir, JOURNAL_NAME))
+        self.last_snapshot_path = None  # backups/ snapshot of the latest backup_current_session
+        self._settings_cache = {}  # settings path -> ((st_mtime_ns, st_size), identity)
+        # Per-phase timeouts (seconds) for the readiness-based waits
+        self.wait_timeouts = {
+            'terminate': 5.0,  # graceful exit after terminate()
+            'kill': 3.0,       # forced exit after kill()
+            'release': 5.0     # open handles under 'Riot Client' going away
+        }
         
     def _get_riot_paths(self):
         """Get Riot Games installation and config paths based on OS"""
@@ -40,13 +150,10 @@ class RiotClient:
                 'settings_file': 'RiotGamesPrivateSettings.yaml'
             }
             
-    def is_running(self):
+    def is_running(self, force_rescan=False):
         """Check if any Riot Client process is running"""
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] in self.process_names:
-                    return True
-            return False
+            return len(self.process_tracker.snapshot(force_rescan)) > 0
         except Exception as e:
             print(f"Error checking if Riot Client is running: {e}")
             return False
@@ -55,49 +162,164 @@ class RiotClient:
         """Get list of running Riot processes"""
         processes = []
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                if proc.info['name'] in self.process_names:
-                    processes.append({
-                        'pid': proc.info['pid'],
-                        'name': proc.info['name'],
-                        'exe': proc.info['exe']
-                    })
+            for proc in self.process_tracker.snapshot():
+                import psutil  # already loaded by the tracker once it finds a process
+                try:
+                    exe = proc.exe()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    exe = None
+                processes.append({
+                    'pid': proc.info['pid'],
+                    'name': proc.info['name'],
+                    'exe': exe
+                })
         except Exception as e:
             print(f"Error getting Riot processes: {e}")
         return processes
         
+    @phase('terminate')
     def terminate_riot_client(self):
-        """Terminate all Riot Client processes"""
+        """Terminate all Riot Client processes
+        
+        Waits on the exact processes that were signalled and returns as soon
+        as they exit, escalating to kill() after the 'terminate' timeout.
+        """
+        import psutil
         terminated = []
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] in self.process_names:
-                    try:
-                        p = psutil.Process(proc.info['pid'])
-                        p.terminate()
-                        terminated.append(proc.info['name'])
-                    except psutil.NoSuchProcess:
-                        pass
-                    except psutil.AccessDenied:
-                        print(f"Access denied when terminating {proc.info['name']}")
-                        
-            # Wait for processes to terminate
-            time.sleep(2)
+            procs = []
+            # One fresh scan so helpers spawned since the last tick are included
+            for proc in self.process_tracker.snapshot(force_rescan=True):
+                try:
+                    proc.terminate()
+                    procs.append(proc)
+                    terminated.append(proc.info['name'])
+                except psutil.NoSuchProcess:
+                    pass
+                except psutil.AccessDenied:
+                    print(f"Access denied when terminating {proc.info['name']}")
+                    
+            if not procs:
+                return terminated
+                
+            # Wait for exactly these processes to exit
+            self.instrumentation.annotate(processes=len(procs))
+            gone, alive = psutil.wait_procs(procs, timeout=self.wait_timeouts['terminate'])
             
-            # Force kill if still running
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] in self.process_names:
+            # Force kill whatever ignored the polite request
+            if alive:
+                print(f"Force killing {len(alive)} Riot process(es) that did not exit")
+                self.instrumentation.annotate(killed=len(alive))
+                for proc in alive:
                     try:
-                        p = psutil.Process(proc.info['pid'])
-                        p.kill()
+                        proc.kill()
                     except (psutil.NoSuchProcess, psutil.AccessDenied):
                         pass
+                gone, alive = psutil.wait_procs(alive, timeout=self.wait_timeouts['kill'])
+                for proc in alive:
+                    print(f"Warning: process {proc.pid} is still running after kill")
                         
         except Exception as e:
             print(f"Error terminating Riot Client: {e}")
+        finally:
+            self.process_tracker.invalidate()
             
         return terminated
         
+    def _get_session_file_holders(self):
+        """List (process name, path) pairs for Riot processes holding files under 'Riot Client' open"""
+        import psutil
+        config_dir = os.path.normcase(os.path.join(self.riot_paths['config'], 'Riot Client'))
+        holders = []
+        for proc in self.process_tracker.snapshot():
+            try:
+                for open_file in proc.open_files():
+                    if os.path.normcase(open_file.path).startswith(config_dir):
+                        holders.append((proc.info['name'], open_file.path))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return holders
+        
+    @phase('wait_release')
+    def wait_for_session_files_released(self, timeout=None):
+        """Wait until no Riot process holds files under 'Riot Client' open
+        
+        Polls with a short backoff so it returns as soon as the handles are
+        gone. Returns False if files are still held when the timeout expires.
+        """
+        if timeout is None:
+            timeout = self.wait_timeouts['release']
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        try:
+            while True:
+                holders = self._get_session_file_holders()
+                if not holders:
+                    return True
+                if time.monotonic() >= deadline:
+                    self.instrumentation.annotate(files_held=len(holders))
+                    for name, path in holders[:5]:
+                        print(f"Warning: {name} still has {path} open")
+                    return False
+                time.sleep(min(delay, max(0, deadline - time.monotonic())))
+                delay = min(delay * 2, 0.5)
+        except Exception as e:
+            print(f"Error checking open session files: {e}")
+            return False
+        
+    def _is_identity_match(self, key, value):
+        """Same rule the YAML dict walk uses: a user/account key with a plausible value"""
+        key = str(key).lower()
+        if any(hint in key for hint in IDENTITY_KEY_HINTS):
+            return isinstance(value, str) and ('@' in value or len(value) > 3)
+        return False
+        
+    def _scan_settings_identity(self, f):
+        """Stream top-level 'key: value' lines and stop at the first identity key"""
+        import yaml
+        for line in f:
+            if not line or line[0] in ' \t#-.\r\n':
+                continue
+            match = TOP_LEVEL_SCALAR_PATTERN.match(line)
+            if not match:
+                continue
+            key, raw_value = match.group(1), match.group(2)
+            if not any(hint in key.lower() for hint in IDENTITY_KEY_HINTS):
+                continue
+            try:
+                # Resolve the scalar exactly as YAML would (quotes, numbers, bools)
+                value = yaml.load(raw_value, Loader=_yaml_safe_loader(yaml))
+            except yaml.YAMLError:
+                continue
+            if self._is_identity_match(key, value):
+                return value
+        return None
+        
+    def _extract_settings_identity(self, settings_path):
+        """Find the logged-in identity in one settings file (None if not found)"""
+        import yaml
+        with open(settings_path, 'r', encoding='utf-8') as f:
+            identity = self._scan_settings_identity(f)
+            if identity is not None:
+                return identity
+            # No simple top-level match, fall back to a full parse
+            f.seek(0)
+            content = f.read()
+            
+        try:
+            settings = yaml.load(content, Loader=_yaml_safe_loader(yaml))
+            if settings and isinstance(settings, dict):
+                # Look for username in various possible locations
+                for key, value in settings.items():
+                    if self._is_identity_match(key, value):
+                        return value
+        except yaml.YAMLError:
+            # If YAML parsing fails, try to find email patterns in raw content
+            emails = EMAIL_PATTERN.findall(content)
+            if emails:
+                return emails[0]
+        return None
+        
     def get_current_user(self):
         """Try to get current logged in user from Riot Client"""
         try:
@@ -111,32 +333,28 @@ class RiotClient:
             
             session_files_found = []
             for settings_path in possible_files:
-                if os.path.exists(settings_path):
-                    session_files_found.append(os.path.basename(settings_path))
-                    
+                try:
+                    st = os.stat(settings_path)
+                except OSError:
+                    self._settings_cache.pop(settings_path, None)
+                    continue
+                session_files_found.append(os.path.basename(settings_path))
+                
+                # Unchanged files are answered from the cache without being re-read
+                cache_key = (st.st_mtime_ns, st.st_size)
+                cached = self._settings_cache.get(settings_path)
+                if cached is not None and cached[0] == cache_key:
+                    identity = cached[1]
+                else:
                     try:
-                        with open(settings_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            
-                        # Try to parse as YAML first
-                        try:
-                            settings = yaml.safe_load(content)
-                            if settings and isinstance(settings, dict):
-                                # Look for username in various possible locations
-                                for key, value in settings.items():
-                                    if 'username' in str(key).lower() or 'user' in str(key).lower() or 'account' in str(key).lower():
-                                        if isinstance(value, str) and ('@' in value or len(value) > 3):
-                                            return f"Logged in as: {value}"
-                        except yaml.YAMLError:
-                            # If YAML parsing fails, try to find email patterns in raw content
-                            import re
-                            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-                            emails = re.findall(email_pattern, content)
-                            if emails:
-                                return f"Logged in as: {emails[0]}"
-                                
+                        identity = self._extract_settings_identity(settings_path)
                     except Exception as e:
                         print(f"Error reading {settings_path}: {e}")
+                        continue
+                    self._settings_cache[settings_path] = (cache_key, identity)
+                    
+                if identity is not None:
+                    return f"Logged in as: {identity}"
                         
             # If we found session files but couldn't extract username
             if session_files_found:
@@ -148,56 +366,240 @@ class RiotClient:
             print(f"Error getting current user: {e}")
             return "Status unknown (error occurred)"
             
+    @phase('backup')
     def backup_current_session(self):
-        """Backup current Riot Client session"""
+        """Backup current Riot Client session
+        
+        Backups go into the backups/ store under the current capture profile.
+        If nothing changed since the previous backup that one is marked as
+        used again instead of writing a new snapshot.
+        """
         try:
             source_dir = os.path.join(self.riot_paths['config'], 'Riot Client')
             if not os.path.exists(source_dir):
                 return False
                 
-            # Create backup directory
-            backup_dir = os.path.join(os.getcwd(), 'backups')
-            os.makedirs(backup_dir, exist_ok=True)
+            profile = get_profile(self.capture_profile)
+            files, dirs = entries_from_directory(source_dir, profile=profile)
+            current_hash = tree_digest({rel_path: (entry.size, entry.mtime_ns) for rel_path, entry in files.items()})
+            
+            # Snapshot names are timestamps, so the last one is the newest
+            snapshots = self.backup_store.list_snapshots()
+            if snapshots:
+                previous_path = os.path.join(self.backup_store.root, snapshots[-1])
+                try:
+                    previous_hash = self.backup_store.manifest_digest(self.backup_store.read_manifest(previous_path))
+                except (OSError, ValueError, KeyError):
+                    previous_hash = None
+                if previous_hash == current_hash:
+                    self.backup_store.touch_snapshot(previous_path)
+                    self.last_snapshot_path = previous_path
+                    print(f"Session unchanged since last backup: {previous_path}")
+                    self.instrumentation.annotate(unchanged=True, files=len(files), bytes=0)
+                    return True
             
             timestamp = time.strftime("%Y%m%d_%H%M%S")
-            backup_path = os.path.join(backup_dir, f'riot_session_backup_{timestamp}')
+            backup_path = os.path.join(self.backup_store.root, f'riot_session_backup_{timestamp}')
             
-            # Copy Riot Client directory
-            shutil.copytree(source_dir, backup_path, dirs_exist_ok=True)
+            # Only content the store has not seen yet is copied
+            stats = self.backup_store.write_snapshot(source_dir, backup_path, profile, self.copy_workers)
+            self.last_snapshot_path = backup_path
             
+            self.instrumentation.annotate(files=stats['files'], bytes=stats['new_bytes'])
             print(f"Session backed up to: {backup_path}")
+            print(f"   {stats['files']} files, {round(stats['new_bytes'] / 1024, 1)} KB new data "
+                  f"at {format_rate(stats['bytes_per_sec'])}")
             return True
             
         except Exception as e:
             print(f"Error backing up session: {e}")
             return False
             
-    def restore_session(self, backup_path):
-        """Restore a Riot Client session from backup"""
+    def sweep_backups(self):
+        """Apply self.backup_retention to backups/; returns (removed names, bytes freed)"""
+        try:
+            removed, freed = apply_retention(self.backup_store, self.backup_retention)
+            if removed:
+                print(f"Removed {len(removed)} old session backup(s), {round(freed / (1024*1024), 2)} MB freed")
+            return removed, freed
+        except Exception as e:
+            print(f"Error cleaning up session backups: {e}")
+            return [], 0
+            
+    def sweep_backups_in_background(self):
+        """Run sweep_backups on a background thread unless one is still running"""
+        if self._sweep_thread is not None and self._sweep_thread.is_alive():
+            return self._sweep_thread
+        self._sweep_thread = threading.Thread(target=self.sweep_backups, daemon=True)
+        self._sweep_thread.start()
+        return self._sweep_thread
+            
+    def get_backup_format(self, backup_path):
+        """Return 'archive', 'store' or 'directory' (raw copy) for a backup, or None"""
+        if not os.path.isdir(backup_path):
+            return None
+        if find_archive(backup_path):
+            return 'archive'
+        if self._store_for(backup_path).is_snapshot(backup_path):
+            return 'store'
+        return 'directory'
+        
+    def _store_for(self, backup_path):
+        """The SessionStore a snapshot path belongs to (backups/ or account_backups/)"""
+        root = os.path.abspath(self.backup_store.root)
+        if os.path.abspath(backup_path).startswith(root + os.sep):
+            return self.backup_store
+        return self.account_store
+        
+    def get_backup_profile(self, backup_path):
+        """Return the capture profile a backup was taken with
+        
+        Backups from before capture profiles hold the whole folder and are
+        treated as the 'full' profile.
+        """
+        name = None
+        try:
+            with open(os.path.join(backup_path, ACCOUNT_INFO_NAME), 'r') as f:
+                name = json.load(f).get('capture_profile')
+        except (OSError, ValueError):
+            pass
+        store = self._store_for(backup_path)
+        if name is None and store.is_snapshot(backup_path):
+            try:
+                name = store.read_manifest(backup_path).get('profile')
+            except (OSError, ValueError):
+                pass
+        return PROFILES.get(name, PROFILES[LEGACY_PROFILE])
+        
+    def _sync_backup_into(self, backup_path, target_dir, verify_hash=False, profile=None):
+        """Make target_dir match a backup of any format; returns sync stats
+        
+        With a capture profile only the paths it covers are compared, written
+        or deleted in target_dir.
+        """
+        archive_path = find_archive(backup_path)
+        if archive_path:
+            # Streamed straight out of the compressed tar, no temp directory
+            return sync_from_archive(archive_path, target_dir, verify_hash=verify_hash, profile=profile)
+        store = self._store_for(backup_path)
+        if store.is_snapshot(backup_path):
+            files, dirs = store.snapshot_entries(backup_path)
+        else:
+            files, dirs = entries_from_directory(backup_path, skip={ACCOUNT_INFO_NAME})
+        return sync_tree(files, dirs, target_dir, verify_hash=verify_hash, profile=profile, workers=self.copy_workers)
+        
+    @phase('restore')
+    def restore_session(self, backup_path, mode=None, verify_hash=False):
+        """Restore a Riot Client session from backup
+        
+        mode 'sync' compares the backup with the live tree by size/mtime (plus
+        content hash with verify_hash) and only copies changed files and deletes
+        extraneous ones. mode 'swap' (the default, see self.restore_mode) does
+        the same sync into a hard-linked staging copy of the live tree and then
+        exchanges it with the live directory in one rename. mode 'replace'
+        deletes the live tree and copies the whole backup back.
+        
+        Only the paths covered by the backup's capture profile are touched;
+        the rest of the live tree (logs, caches, ...) is left as it is.
+        """
+        mode = mode or self.restore_mode
         try:
             target_dir = os.path.join(self.riot_paths['config'], 'Riot Client')
+            profile = self.get_backup_profile(backup_path)
             
-            # Remove current session
-            if os.path.exists(target_dir):
-                shutil.rmtree(target_dir)
-                
-            # Restore from backup
-            shutil.copytree(backup_path, target_dir, dirs_exist_ok=True)
+            if mode == 'sync':
+                stats = self._sync_backup_into(backup_path, target_dir, verify_hash, profile)
+            elif mode == 'swap':
+                for stale_dir in find_stale_staging_dirs(target_dir):
+                    self._defer_delete(stale_dir)
+                staging_dir = make_staging_dir(target_dir)
+                try:
+                    # Hard links make the staging copy metadata-only; the sync
+                    # then replaces (never rewrites) the files that differ
+                    if os.path.isdir(target_dir):
+                        link_tree(target_dir, staging_dir)
+                    stats = self._sync_backup_into(backup_path, staging_dir, verify_hash, profile)
+                    old_dir = swap_in(staging_dir, target_dir)
+                except Exception:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                    raise
+                # The previous tree is removed off the critical path
+                if old_dir:
+                    self._defer_delete(old_dir)
+            else:
+                # Remove the current session, then copy the whole backup back
+                if os.path.exists(target_dir):
+                    live_files, live_dirs = scan_live(target_dir, profile)
+                    remove_extraneous(target_dir, live_files, live_dirs, (), ())
+                stats = self._sync_backup_into(backup_path, target_dir, profile=profile)
             
-            print(f"Session restored from: {backup_path}")
+            self.last_restore_stats = stats
+            self.instrumentation.annotate(mode=mode, profile=profile.name, files=stats['files_copied'],
+                                          bytes=stats['bytes_written'], unchanged=stats['files_unchanged'],
+                                          deleted=stats['files_deleted'])
+            print(f"Session restored from: {backup_path} ('{profile.name}' profile)")
+            print(f"   {stats['files_copied']} files written ({round(stats['bytes_written'] / 1024, 1)} KB "
+                  f"at {format_rate(stats['bytes_per_sec'])}), "
+                  f"{stats['files_unchanged']} unchanged, {stats['files_deleted']} deleted")
             return True
             
         except Exception as e:
             print(f"Error restoring session: {e}")
             return False
             
+    def _get_trash(self):
+        """TrashBin beside 'Riot Client' (same filesystem, so moving into it is a rename)"""
+        root = os.path.join(self.riot_paths['config'], TRASH_DIR_NAME)
+        if self._trash is None or self._trash.root != root:
+            self._trash = TrashBin(root)
+        return self._trash
+        
+    def _defer_delete(self, path):
+        """Move a file or directory tree to the trash and purge it in the background"""
+        trash = self._get_trash()
+        try:
+            trash.move(path)
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return trash.purge_in_background()
+        
     def _get_account_backup_path(self, display_name):
         """Get the backup path for a specific account"""
-        return os.path.join(os.getcwd(), 'account_backups', display_name)
+        return os.path.join(self.data_dir, 'account_backups', display_name)
             
-    def backup_account_session(self, account):
-        """Create a backup of the current session for a specific account (for 'Stay logged in' sessions)"""
+    def _remove_backup_payload(self, backup_dir, keep_format, previous_format=None):
+        """Drop whatever session data in backup_dir is not in keep_format"""
+        if previous_format == 'directory':
+            for name in os.listdir(backup_dir):
+                path = os.path.join(backup_dir, name)
+                if name == ACCOUNT_INFO_NAME or name.startswith(ARCHIVE_BASENAME) or name == MANIFEST_NAME:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+        if keep_format != 'store' and self.account_store.is_snapshot(backup_dir):
+            os.remove(os.path.join(backup_dir, MANIFEST_NAME))
+        if keep_format != 'archive':
+            for extension in COMPRESSIONS.values():
+                archive_path = os.path.join(backup_dir, ARCHIVE_BASENAME + extension)
+                if os.path.exists(archive_path):
+                    os.remove(archive_path)
+                    
+    @exclusive
+    @phase('account_backup')
+    def backup_account_session(self, account, backup_format=None, profile=None):
+        """Create a backup of the current session for a specific account (for 'Stay logged in' sessions)
+        
+        backup_format is 'store' (deduplicated object store) or 'archive'
+        (compressed tar); it defaults to self.backup_format. profile names
+        the capture profile (see core.capture_profiles) and defaults to
+        self.capture_profile.
+        """
+        backup_format = backup_format or self.backup_format
         try:
+            profile = get_profile(profile or self.capture_profile)
             print(f"Creating session backup for {account['display_name']}...")
             
             # Ensure user is actually logged in before backing up
@@ -208,18 +610,34 @@ class RiotClient:
             # Create account-specific backup directory
             backup_dir = self._get_account_backup_path(account['display_name'])
             
-            # Remove old backup if exists
-            if os.path.exists(backup_dir):
-                print("Removing old session backup...")
-                shutil.rmtree(backup_dir)
-                
-            os.makedirs(backup_dir, exist_ok=True)
-            
             source_dir = os.path.join(self.riot_paths['config'], 'Riot Client')
             if os.path.exists(source_dir):
-                print("Copying session files...")
-                # Copy current session to account backup
-                shutil.copytree(source_dir, backup_dir, dirs_exist_ok=True)
+                # Old-style raw copies are removed first; an existing snapshot
+                # of the same format is simply superseded by the new one
+                if self.get_backup_format(backup_dir) == 'directory':
+                    print("Removing old session backup...")
+                    shutil.rmtree(backup_dir)
+                    
+                # One stat-only listing of the whole folder shows what each
+                # profile would capture; only the chosen one is copied
+                all_files, all_dirs = entries_from_directory(source_dir)
+                usage = profile_usage(all_files)
+                    
+                if backup_format == 'archive':
+                    print("Compressing session files...")
+                    files, dirs = profile.select(all_files, all_dirs)
+                    stats = write_archive(files, dirs, backup_dir, self.archive_compression)
+                else:
+                    print("Storing session files...")
+                    # Only content the store has not seen yet is written
+                    stats = self.account_store.write_snapshot(source_dir, backup_dir, profile, self.copy_workers)
+                stats['profile'] = profile.name
+                stats['profile_usage'] = usage
+                self.last_backup_stats = stats
+                self.instrumentation.annotate(format=backup_format, profile=profile.name,
+                                              files=stats['files'], bytes=stats['bytes'])
+                self._remove_backup_payload(backup_dir, backup_format)
+                freed = self.account_store.gc()
                 
                 # Save account info with session details
                 account_info = {
@@ -228,14 +646,28 @@ class RiotClient:
                     'backup_created': time.strftime("%Y-%m-%d %H:%M:%S"),
                     'session_type': 'stay_logged_in',
                     'riot_client_running': self.is_running(),
-                    'backup_size_mb': round(self._get_directory_size(backup_dir) / (1024*1024), 2)
+                    'backup_format': backup_format,
+                    'backup_size_mb': round(stats['bytes'] / (1024*1024), 2),
+                    'file_count': stats['files'],
+                    'capture_profile': profile.name,
+                    'profile_bytes': {name: size for name, (size, count) in usage.items()}
                 }
                 
-                with open(os.path.join(backup_dir, 'account_info.json'), 'w') as f:
+                with open(os.path.join(backup_dir, ACCOUNT_INFO_NAME), 'w') as f:
                     json.dump(account_info, f, indent=2)
+                self._index_backup(account['display_name'], backup_dir, backup_format, stats)
                 
                 print(f"✅ Session backup created successfully!")
-                print(f"   Size: {account_info['backup_size_mb']} MB")
+                print(f"   Size: {account_info['backup_size_mb']} MB ({stats['files']} files, '{profile.name}' profile)")
+                for name, (size, count) in usage.items():
+                    print(f"     {name:>8}: {round(size / (1024*1024), 2)} MB in {count} files")
+                if backup_format == 'archive':
+                    print(f"   Compressed to: {round(stats['archive_bytes'] / (1024*1024), 2)} MB")
+                else:
+                    print(f"   New data stored: {round(stats['new_bytes'] / (1024*1024), 2)} MB in {stats['new_objects']} objects "
+                          f"at {format_rate(stats['bytes_per_sec'])}")
+                if freed:
+                    print(f"   Reclaimed: {round(freed / (1024*1024), 2)} MB of unused objects")
                 print(f"   Location: {backup_dir}")
                 return True
             else:
@@ -246,54 +678,167 @@ class RiotClient:
             print(f"Error creating account session backup: {e}")
             return False
             
-    def _get_directory_size(self, directory):
-        """Get total size of directory in bytes"""
-        total_size = 0
+    def migrate_account_backup(self, backup_dir, target_format='archive', compression=None):
+        """Convert one account backup to target_format ('archive' or 'store')
+        
+        Returns the new backup's stats if it was converted, None if it
+        already had that format or there was nothing to convert.
+        """
+        current = self.get_backup_format(backup_dir)
+        if current is None or current == target_format:
+            return None
+        profile = self.get_backup_profile(backup_dir)
+            
+        if target_format == 'archive':
+            if current == 'store':
+                files, dirs = self.account_store.snapshot_entries(backup_dir)
+            else:
+                files, dirs = entries_from_directory(backup_dir, skip={ACCOUNT_INFO_NAME})
+            stats = write_archive(files, dirs, backup_dir, compression or self.archive_compression)
+        else:
+            # The store ingests from a plain tree, so give it one beside the backup
+            work_dir = backup_dir.rstrip(os.sep) + '.migrating'
+            shutil.rmtree(work_dir, ignore_errors=True)
+            try:
+                if current == 'archive':
+                    sync_from_archive(find_archive(backup_dir), work_dir)
+                else:
+                    files, dirs = entries_from_directory(backup_dir, skip={ACCOUNT_INFO_NAME})
+                    sync_tree(files, dirs, work_dir, workers=self.copy_workers)
+                stats = self.account_store.write_snapshot(work_dir, backup_dir, profile, self.copy_workers)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+                
+        self._remove_backup_payload(backup_dir, target_format, current)
+        return stats
+        
+    def migrate_account_backups(self, target_format='archive', compression=None):
+        """Convert every backup under account_backups/; returns (converted, failed) names"""
+        root = os.path.join(self.data_dir, 'account_backups')
+        converted = []
+        failed = []
+        if not os.path.isdir(root):
+            return converted, failed
+        for name in sorted(os.listdir(root)):
+            backup_dir = os.path.join(root, name)
+            if name.startswith('.') or not os.path.isdir(backup_dir):
+                continue
+            try:
+                stats = self.migrate_account_backup(backup_dir, target_format, compression)
+                if stats:
+                    self._index_backup(name, backup_dir, target_format, stats)
+                    converted.append(name)
+            except Exception as e:
+                print(f"Error migrating backup for {name}: {e}")
+                failed.append(name)
+        self.account_store.gc()
+        return converted, failed
+        
+    def _index_backup(self, display_name, backup_dir, backup_format, stats):
+        """Record a written backup in the session index, if one is attached"""
+        if self.session_index is not None:
+            self.session_index.record_session(
+                display_name, backup_dir, backup_format,
+                stats['bytes'], stats['files'], stats.get('manifest_hash')
+            )
+            
+    def _measure_backup(self, backup_dir):
+        """Work out files/bytes/manifest_hash for an existing backup of any format"""
+        backup_format = self.get_backup_format(backup_dir)
+        if backup_format == 'archive':
+            listing = list_archive(find_archive(backup_dir))
+        elif backup_format == 'store':
+            manifest = self.account_store.read_manifest(backup_dir)
+            listing = {rel_path: (entry['size'], entry['mtime_ns']) for rel_path, entry in manifest['files'].items()}
+        else:
+            files, dirs = entries_from_directory(backup_dir, skip={ACCOUNT_INFO_NAME})
+            listing = {rel_path: (entry.size, entry.mtime_ns) for rel_path, entry in files.items()}
+        return {
+            'files': len(listing),
+            'bytes': sum(size for size, mtime_ns in listing.values()),
+            'manifest_hash': tree_digest(listing)
+        }
+        
+    def rebuild_session_index(self):
+        """Re-index every backup under account_backups/ (one-time filesystem scan)"""
+        if self.session_index is None:
+            return 0
+        root = os.path.join(self.data_dir, 'account_backups')
+        indexed = 0
+        with self.session_index.transaction():
+            if os.path.isdir(root):
+                for name in sorted(os.listdir(root)):
+                    backup_dir = os.path.join(root, name)
+                    if name.startswith('.') or not os.path.isdir(backup_dir):
+                        continue
+                    try:
+                        stats = self._measure_backup(backup_dir)
+                    except Exception as e:
+                        print(f"Error indexing backup for {name}: {e}")
+                        continue
+                    self._index_backup(name, backup_dir, self.get_backup_format(backup_dir), stats)
+                    indexed += 1
+        return indexed
+        
+    @exclusive
+    def delete_account_backup(self, display_name):
+        """Delete an account's session backup and its index row"""
         try:
-            for dirpath, dirnames, filenames in os.walk(directory):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    if os.path.exists(filepath):
-                        total_size += os.path.getsize(filepath)
+            backup_dir = self._get_account_backup_path(display_name)
+            if os.path.exists(backup_dir):
+                shutil.rmtree(backup_dir)
+            self.account_store.gc()
+            if self.session_index is not None:
+                self.session_index.delete_session(display_name)
+            return True
         except Exception as e:
-            print(f"Error calculating directory size: {e}")
-        return total_size
+            print(f"Error deleting session backup for {display_name}: {e}")
+            return False
+            
+    def get_storage_usage(self):
+        """Disk usage of account_backups/ and backups/
+        
+        Returns {folder: {'total_bytes', 'total_files', 'entries': {name: (bytes, files)}}}.
+        In account_backups/ the '.objects' entry holds the shared file
+        content, so per-account entries are mostly small manifests.
+        """
+        usage = {}
+        for folder in ('account_backups', 'backups'):
+            usage[folder] = storage_usage(os.path.join(self.data_dir, folder))
+        return usage
 
 
-    def clear_current_session(self):
-        """Clear current Riot session data to force logout"""
+    @exclusive
+    @phase('clear')
+    def clear_current_session(self, targets=None):
+        """Clear current Riot session data to force logout
+        
+        targets limits the clear to some of LOGOUT_TARGETS (default: all).
+        With clear_mode 'trash' each target is only renamed into the trash
+        folder and deleted later on a low-priority background thread.
+        """
         try:
             print("Clearing current session data...")
             
             # Main config directory
             config_dir = os.path.join(self.riot_paths['config'], 'Riot Client')
             
-            # Files and directories to clear for logout
-            logout_targets = [
-                'RiotGamesPrivateSettings.yaml',
-                'RiotClientPrivateSettings.yaml', 
-                'Data/RiotGamesPrivateSettings.yaml',
-                'Data/RiotClientPrivateSettings.yaml',
-                'Data/Cache',
-                'Data/Logs', 
-                'Data/CrashReporting',
-                'Data/RiotClientInstalls.json',
-                'Data/RiotGamesPrivateSettings.json',  # JSON variant
-                'Plugins/Authentication',
-                'Plugins/rcp-fe-lol-auth',
-                'Plugins/rcp-fe-common-libs',
-                'RSOData',  # Riot Single Sign-On data
-                'LocalStorage',  # Browser-like local storage
-                'sessionStorage'  # Session storage
-            ]
-            
             cleared_items = []
+            trashed = False
             
-            for target in logout_targets:
+            for target in (LOGOUT_TARGETS if targets is None else targets):
                 target_path = os.path.join(config_dir, target)
                 
                 if os.path.exists(target_path):
                     try:
+                        if self.clear_mode == 'trash':
+                            try:
+                                self._get_trash().move(target_path)
+                                trashed = True
+                                cleared_items.append(f"Trashed: {target}")
+                                continue
+                            except OSError:
+                                pass  # not renameable, delete it in place
                         if os.path.isfile(target_path):
                             os.remove(target_path)
                             cleared_items.append(f"File: {target}")
@@ -303,6 +848,10 @@ class RiotClient:
                     except Exception as e:
                         print(f"Warning: Could not clear {target}: {e}")
                         
+            if trashed:
+                self._get_trash().purge_in_background()
+            self.instrumentation.annotate(files=len(cleared_items), mode=self.clear_mode)
+                
             if cleared_items:
                 print(f"Cleared {len(cleared_items)} session items:")
                 for item in cleared_items:
@@ -339,6 +888,7 @@ class RiotClient:
             print(f"Error checking login status: {e}")
             return False
             
+    @exclusive
     def force_logout(self):
         """Force logout by clearing session and restarting client"""
         try:
@@ -348,14 +898,11 @@ class RiotClient:
             if self.is_running():
                 print("Closing Riot Client...")
                 self.terminate_riot_client()
-                time.sleep(3)
                 
-            # Step 2: Clear session data
+            # Step 2: Clear session data once nothing holds it open
+            self.wait_for_session_files_released()
             self.clear_current_session()
             
-            # Step 3: Wait a moment for file system
-            time.sleep(2)
-            
             print("Logout completed!")
             return True
             
@@ -363,44 +910,100 @@ class RiotClient:
             print(f"Error during logout: {e}")
             return False
 
-    def switch_account(self, account):
-        """Switch to a different Riot account"""
+    def _report_progress(self, progress_callback, phase, message):
+        """Print a switch progress message and forward it to the caller"""
+        print(message)
+        if progress_callback:
+            progress_callback(phase, message)
+            
+    def _check_cancelled(self, cancel_check):
+        """Abort the switch at a phase boundary if the caller asked to cancel"""
+        if cancel_check and cancel_check():
+            raise SwitchCancelled()
+            
+    @exclusive
+    @phase('switch', trace=True)
+    def switch_account(self, account, progress_callback=None, cancel_check=None):
+        """Switch to a different Riot account
+        
+        progress_callback(phase, message) is called at the start of each phase
+        ('terminate', 'clear', 'restore', 'launch'). cancel_check() is polled
+        between phases (not between clear and restore); returning True stops
+        the switch before the next phase.
+        
+        Every phase is written to the switch journal before it starts, so a
+        switch that fails or dies half way is finished or undone by
+        recover_interrupted_switch().
+        """
+        journaled = False
         try:
             print(f"Switching to account: {account['display_name']}")
+            self.instrumentation.annotate(account=account['display_name'])
+            
+            # A switch that died earlier is settled before this one begins
+            self.recover_interrupted_switch()
+            
+            live_dir = os.path.join(self.riot_paths['config'], 'Riot Client')
+            account_backup_dir = self._get_account_backup_path(account['display_name'])
+            has_saved_session = os.path.exists(account_backup_dir)
+            self.journal.begin(account=account['display_name'], live_dir=live_dir,
+                               target_backup=account_backup_dir if has_saved_session else None,
+                               restore_mode=self.restore_mode)
+            journaled = True
+            
+            # Step 1: Handle current session. The pre-switch backup is also
+            # what an interrupted switch rolls back to.
+            self.last_snapshot_path = None
+            if self.is_logged_in():
+                print("Backing up current session...")
+                if self.backup_current_session():
+                    self.journal.record('snapshot', path=self.last_snapshot_path)
             
-            # Step 1: Handle current session
-            current_logged_in = False
             if self.is_running():
-                current_logged_in = self.is_logged_in()
-                if current_logged_in:
-                    print("Backing up current session...")
-                    self.backup_current_session()
-                
-                print("Closing Riot Client...")
+                self._check_cancelled(cancel_check)
+                self._report_progress(progress_callback, 'terminate', "Closing Riot Client...")
+                self.journal.record('phase', phase='terminate')
                 self.terminate_riot_client()
-                time.sleep(3)  # Wait for complete shutdown
             
-            # Step 2: Clear current session data to ensure clean switch
-            print("Clearing session data...")
-            self.clear_current_session()
-            time.sleep(1)
-                
-            # Step 3: Check if we have a saved session for target account
-            account_backup_dir = self._get_account_backup_path(account['display_name'])
+            # Step 2: Clear current session data to ensure clean switch.
+            # The restore replaces everything within the backup's capture
+            # profile (in every mode), so only the caches and logs outside it
+            # still need the separate clear; targets that are outside the
+            # profile but not disposable are left as they are.
+            clear_targets = list(LOGOUT_TARGETS)
+            if has_saved_session:
+                profile = self.get_backup_profile(account_backup_dir)
+                clear_targets = [target for target in DISPOSABLE_TARGETS if not profile.matches(target)]
             
-            if os.path.exists(account_backup_dir):
-                print(f"Restoring saved session for {account['display_name']}...")
-                self.restore_session(account_backup_dir)
+            self._check_cancelled(cancel_check)
+            self.wait_for_session_files_released()
+            if clear_targets:
+                self._report_progress(progress_callback, 'clear', "Clearing session data...")
+                self.journal.record('phase', phase='clear', targets=clear_targets)
+                self.clear_current_session(clear_targets)
+                self.journal.record('done', phase='clear')
+                
+            # Step 3: Restore the saved session for target account, if any.
+            # Once the clear has run, cancellation waits until the restore is
+            # done so the live folder never stays logged out.
+            if has_saved_session:
+                self._report_progress(progress_callback, 'restore', f"Restoring saved session for {account['display_name']}...")
+                self.journal.record('phase', phase='restore', source=account_backup_dir, mode=self.restore_mode)
+                if not self.restore_session(account_backup_dir):
+                    raise RuntimeError(f"Could not restore the saved session for {account['display_name']}")
+                self.journal.record('done', phase='restore')
                 print("✅ Session restored!")
-                print("Starting Riot Client...")
-                time.sleep(2)
+                self._check_cancelled(cancel_check)
+                self._report_progress(progress_callback, 'launch', "Starting Riot Client...")
+                self.journal.record('phase', phase='launch')
                 self.start_riot_client()
                 print(f"🎮 Riot Client should now open logged into {account['display_name']}")
                 
             else:
                 print(f"No saved session found for {account['display_name']}")
-                print("Starting Riot Client for manual login...")
-                time.sleep(1)
+                self._check_cancelled(cancel_check)
+                self._report_progress(progress_callback, 'launch', "Starting Riot Client for manual login...")
+                self.journal.record('phase', phase='launch')
                 self.start_riot_client()
                 
                 print(f"\n📋 SETUP INSTRUCTIONS FOR {account['display_name'].upper()}:")
@@ -412,15 +1015,89 @@ class RiotClient:
                 print("6. ✅ Future switches to this account will be automatic!")
                 print("=" * 60)
                 
+            self.journal.end('done')
+            # Old pre-switch backups are pruned once the switch is done
+            self.sweep_backups_in_background()
             return True
             
+        except SwitchCancelled:
+            # Cancellation is honoured before the clear or after the restore,
+            # so the live folder holds a whole session either way
+            if journaled:
+                self.journal.end('cancelled')
+            self.instrumentation.annotate(cancelled=True)
+            print(f"Switch to {account['display_name']} cancelled")
+            return False
         except Exception as e:
             print(f"Error switching account: {e}")
+            if journaled:
+                recovery = self.recover_interrupted_switch()
+                if recovery:
+                    self.instrumentation.annotate(recovered=recovery['action'])
             return False
             
+    @exclusive
+    def recover_interrupted_switch(self):
+        """Finish or undo a switch that failed or died half way
+        
+        Reads the switch journal; if the last switch never ended and its
+        process is gone, the live 'Riot Client' folder is repaired in one
+        step. If the switch got past the restore there is nothing to do.
+        Otherwise it is rolled forward (the recorded clear is redone and the
+        target account's backup restored) or, if that fails, rolled back to
+        the pre-switch snapshot in backups/.
+        
+        Returns None if there was nothing to recover, else a dict with the
+        'action' taken ('none', 'rolled_forward', 'rolled_back' or 'failed'),
+        the 'account' being switched to and the last 'phase' it started.
+        """
+        records = self.journal.incomplete()
+        if records is None or self.journal.owner_alive(records):
+            return None
+        begin = records[0]
+        started = [record for record in records if record.get('event') == 'phase']
+        finished = {record.get('phase') for record in records if record.get('event') == 'done'}
+        snapshots = [record['path'] for record in records if record.get('event') == 'snapshot' and record.get('path')]
+        clear = next((record for record in started if record.get('phase') == 'clear'), None)
+        touched = any(record.get('phase') in ('clear', 'restore') for record in started)
+        last_phase = started[-1]['phase'] if started else None
+        target_backup = begin.get('target_backup')
+        print(f"Recovering interrupted switch to {begin.get('account')} (last phase: {last_phase or 'none'})")
+        
+        action = 'none'
+        if touched and 'restore' not in finished:
+            # The live folder may be empty or half restored
+            action = 'failed'
+            try:
+                if self.is_running():
+                    self.terminate_riot_client()
+                self.wait_for_session_files_released()
+                if target_backup is None or os.path.isdir(target_backup):
+                    if clear is not None:
+                        self.clear_current_session(clear.get('targets'))
+                    if target_backup is None or self.restore_session(target_backup):
+                        action = 'rolled_forward'
+                if action == 'failed' and snapshots and os.path.isdir(snapshots[-1]):
+                    if self.restore_session(snapshots[-1]):
+                        action = 'rolled_back'
+            except Exception as e:
+                print(f"Error recovering switch: {e}")
+        elif touched:
+            action = 'rolled_forward'  # only the launch was missing
+        
+        self.journal.end('recovered', action=action)
+        print(f"Switch recovery: {action}")
+        return {'action': action, 'account': begin.get('account'), 'phase': last_phase}
+            
+    @phase('launch')
     def start_riot_client(self):
         """Start the Riot Client"""
         try:
+            if self.launch_command:
+                subprocess.Popen(self.launch_command)
+                self.process_tracker.invalidate()
+                return True
+                
             if self.system == "Windows":
                 riot_exe = os.path.join(self.riot_paths['install'], 'Riot Client', 'RiotClientServices.exe')
             elif self.system == "Darwin":
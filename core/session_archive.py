@@ -0,0 +1,209 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+from contextlib import contextmanager
+from core.session_sync import scan_live, remove_extraneous, write_file, file_sha256, tree_digest
+
+ARCHIVE_BASENAME = 'session.tar'
+# compression name -> file extension (zstd needs the optional 'zstandard' package)
+COMPRESSIONS = {
+    'zstd': '.zst',
+    'xz': '.xz',
+    'gz': '.gz'
+}
+MTIME_NS_KEY = 'RIOTSWITCHER.mtime_ns'
+ZSTD_LEVEL = 10
+
+def zstd_available():
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def default_compression():
+    """zstd when the zstandard package is installed, otherwise stdlib lzma"""
+    return 'zstd' if zstd_available() else 'xz'
+
+def find_archive(snapshot_dir):
+    """Return the session archive inside snapshot_dir, or None"""
+    for extension in COMPRESSIONS.values():
+        path = os.path.join(snapshot_dir, ARCHIVE_BASENAME + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def _compression_of(archive_path):
+    for compression, extension in COMPRESSIONS.items():
+        if archive_path.endswith(ARCHIVE_BASENAME + extension):
+            return compression
+    raise ValueError(f"Unknown session archive type: {archive_path}")
+
+@contextmanager
+def _open_tar_writer(raw, compression):
+    import tarfile
+    if compression == 'zstd':
+        import zstandard
+        with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False) as writer:
+            with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                yield tar
+    else:
+        with tarfile.open(fileobj=raw, mode='w|' + compression, format=tarfile.PAX_FORMAT) as tar:
+            yield tar
+
+@contextmanager
+def _open_tar_reader(archive_path):
+    import tarfile
+    compression = _compression_of(archive_path)
+    with open(archive_path, 'rb') as raw:
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise RuntimeError("This backup is zstd-compressed; install 'zstandard' to restore it") from None
+            with zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    yield tar
+        else:
+            with tarfile.open(fileobj=raw, mode='r|' + compression) as tar:
+                yield tar
+
+def _safe_member_name(name):
+    """Reject absolute paths and '..' components in member names"""
+    parts = name.split('/')
+    if name.startswith('/') or '..' in parts or not name:
+        return None
+    return name
+
+def write_archive(files, dirs, snapshot_dir, compression=None):
+    """Stream the given sync entries into snapshot_dir/session.tar.<ext>
+
+    Any archive of another compression in snapshot_dir is replaced. Returns a
+    stats dict (files, bytes, archive_bytes, manifest_hash).
+    """
+    import tarfile
+    compression = compression or default_compression()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    archive_path = os.path.join(snapshot_dir, ARCHIVE_BASENAME + COMPRESSIONS[compression])
+    tmp_path = f"{archive_path}.{uuid.uuid4().hex}.tmp"
+    stats = {'files': 0, 'bytes': 0, 'archive_bytes': 0}
+    listing = {}
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with _open_tar_writer(raw, compression) as tar:
+                for rel_dir in sorted(dirs):
+                    info = tarfile.TarInfo(rel_dir)
+                    info.type = tarfile.DIRTYPE
+                    info.mode = 0o755
+                    tar.addfile(info)
+                for rel_path in sorted(files):
+                    entry = files[rel_path]
+                    try:
+                        f = open(entry.source, 'rb')
+                    except OSError:
+                        continue  # vanished since it was listed
+                    with f:
+                        info = tarfile.TarInfo(rel_path)
+                        info.size = os.fstat(f.fileno()).st_size
+                        info.mtime = entry.mtime_ns // 1_000_000_000
+                        info.mode = 0o644
+                        info.pax_headers = {MTIME_NS_KEY: str(entry.mtime_ns)}
+                        tar.addfile(info, f)
+                    listing[rel_path] = (info.size, entry.mtime_ns)
+                    stats['files'] += 1
+                    stats['bytes'] += info.size
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    for other in COMPRESSIONS.values():
+        other_path = os.path.join(snapshot_dir, ARCHIVE_BASENAME + other)
+        if other_path != archive_path and os.path.exists(other_path):
+            os.remove(other_path)
+    stats['archive_bytes'] = os.path.getsize(archive_path)
+    stats['manifest_hash'] = tree_digest(listing)
+    return stats
+
+def list_archive(archive_path):
+    """Return {rel_path: (size, mtime_ns)} for the files in an archive (headers only)"""
+    listing = {}
+    with _open_tar_reader(archive_path) as tar:
+        for member in tar:
+            rel_path = _safe_member_name(member.name)
+            if rel_path is not None and member.isfile():
+                listing[rel_path] = (member.size, _member_mtime_ns(member))
+    return listing
+
+def _member_mtime_ns(member):
+    value = member.pax_headers.get(MTIME_NS_KEY)
+    if value is not None:
+        return int(value)
+    return int(member.mtime) * 1_000_000_000
+
+def _write_if_changed(tar, member, dest, mtime_ns, live_digest):
+    """Stream a member to a temp file while hashing it; keep it only if it differs"""
+    tmp_path = dest + '.rs-tmp'
+    digest = hashlib.sha256()
+    source = tar.extractfile(member)
+    with open(tmp_path, 'wb') as f:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+            f.write(chunk)
+    if digest.hexdigest() == live_digest:
+        os.remove(tmp_path)
+        return False
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, dest)
+    return True
+
+def sync_from_archive(archive_path, target_dir, verify_hash=False, profile=None):
+    """Make target_dir match the archive in one streaming pass
+
+    Works like session_sync.sync_tree: unchanged files (same size and mtime,
+    plus same hash with verify_hash) are skipped, changed ones rewritten and
+    extraneous ones deleted (only within the capture profile, if given).
+    Nothing is staged in a temp directory.
+    """
+    started = time.monotonic()
+    stats = {'files_copied': 0, 'bytes_written': 0, 'files_unchanged': 0, 'files_deleted': 0}
+    os.makedirs(target_dir, exist_ok=True)
+    live_files, live_dirs = scan_live(target_dir, profile)
+    seen_files = set()
+    seen_dirs = set()
+
+    with _open_tar_reader(archive_path) as tar:
+        for member in tar:
+            rel_path = _safe_member_name(member.name)
+            if rel_path is None:
+                continue
+            dest = os.path.join(target_dir, *rel_path.split('/'))
+            if member.isdir():
+                seen_dirs.add(rel_path)
+                if rel_path in live_files:
+                    os.remove(dest)
+                os.makedirs(dest, exist_ok=True)
+                continue
+            if not member.isfile():
+                continue
+            seen_files.add(rel_path)
+            mtime_ns = _member_mtime_ns(member)
+            if rel_path in live_dirs:
+                shutil.rmtree(dest, ignore_errors=True)
+            elif live_files.get(rel_path) == (member.size, mtime_ns):
+                if not verify_hash or not _write_if_changed(tar, member, dest, mtime_ns, file_sha256(dest)):
+                    stats['files_unchanged'] += 1
+                else:
+                    stats['files_copied'] += 1
+                    stats['bytes_written'] += member.size
+                continue
+            write_file(dest, tar.extractfile(member), mtime_ns)
+            stats['files_copied'] += 1
+            stats['bytes_written'] += member.size
+
+    stats['files_deleted'] = remove_extraneous(target_dir, live_files, live_dirs, seen_files, seen_dirs)
+    stats['seconds'] = time.monotonic() - started
+    stats['bytes_per_sec'] = stats['bytes_written'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    return stats
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from core.session_sync import SyncEntry, tree_digest, entries_from_directory
+from core.file_clone import clone_file
+from core.parallel_copy import ParallelCopier
+
+MANIFEST_NAME = 'manifest.json'
+OBJECTS_DIR = '.objects'
+HASH_CACHE_NAME = '.hash_cache.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class SessionStore:
+    """Content-addressed, deduplicated store for session snapshots
+
+    Every file is stored once under .objects/<hash[:2]>/<hash[2:]>. A snapshot
+    is a directory holding a manifest.json that maps relative paths to object
+    hashes, so byte-identical files are shared by all snapshots.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, OBJECTS_DIR)
+        self._hash_cache_path = os.path.join(root, HASH_CACHE_NAME)
+        self._hash_cache = None  # source path -> [size, mtime_ns, digest]
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def is_snapshot(self, snapshot_dir):
+        """True if snapshot_dir holds a store manifest (rather than a raw copy)"""
+        return os.path.isfile(os.path.join(snapshot_dir, MANIFEST_NAME))
+
+    def read_manifest(self, snapshot_dir):
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def manifest_digest(self, manifest):
+        """Digest identifying the file listing of a manifest"""
+        return tree_digest({rel_path: (entry['size'], entry['mtime_ns'])
+                            for rel_path, entry in manifest['files'].items()})
+
+    def snapshot_entries(self, snapshot_dir):
+        """Return (files, dirs) sync entries that point at the stored objects"""
+        manifest = self.read_manifest(snapshot_dir)
+        files = {}
+        for rel_path, entry in manifest['files'].items():
+            files[rel_path] = SyncEntry(entry['size'], entry['mtime_ns'], entry['hash'],
+                                        self.object_path(entry['hash']))
+        return files, set(manifest['dirs'])
+
+    def _load_hash_cache(self):
+        if self._hash_cache is None:
+            try:
+                with open(self._hash_cache_path, 'r', encoding='utf-8') as f:
+                    self._hash_cache = json.load(f)
+            except (OSError, ValueError):
+                self._hash_cache = {}
+        return self._hash_cache
+
+    def _save_hash_cache(self):
+        tmp_path = f"{self._hash_cache_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._hash_cache, f)
+        os.replace(tmp_path, self._hash_cache_path)
+
+    def hash_file(self, path, size, mtime_ns):
+        """Hash a file, reusing the cached digest while its size and mtime are unchanged"""
+        cache = self._load_hash_cache()
+        cached = cache.get(path)
+        if cached and cached[0] == size and cached[1] == mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        cache[path] = [size, mtime_ns, digest]
+        return digest
+
+    def _store_object(self, path, digest):
+        """Clone a file into the object store unless that content is already there"""
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            return False
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{uuid.uuid4().hex}.tmp"
+        clone_file(path, tmp_path)
+        os.replace(tmp_path, object_path)
+        return True
+
+    def write_snapshot(self, source_dir, snapshot_dir, profile=None, workers=None):
+        """Ingest source_dir into the store and write snapshot_dir/manifest.json
+
+        With a capture profile (see core.capture_profiles) only the files it
+        covers are ingested and its name is recorded in the manifest. Files
+        are hashed and stored by `workers` threads (see core.parallel_copy).
+        Returns a stats dict (files, bytes, new_objects, new_bytes, seconds,
+        bytes_per_sec, manifest_hash).
+        """
+        with self._lock:
+            entries, dirs = entries_from_directory(source_dir, profile=profile)
+            self._load_hash_cache()  # before the worker threads share it
+            files = {}
+
+            def ingest(rel_path):
+                entry = entries[rel_path]
+                try:
+                    digest = self.hash_file(entry.source, entry.size, entry.mtime_ns)
+                    stored = self._store_object(entry.source, digest)
+                except OSError:
+                    return None  # vanished since it was listed
+                files[rel_path] = {'hash': digest, 'size': entry.size, 'mtime_ns': entry.mtime_ns}
+                return entry.size if stored else None
+
+            copy_stats = ParallelCopier(workers).run(ingest, sorted(entries))
+            stats = {
+                'files': len(files),
+                'bytes': sum(entry['size'] for entry in files.values()),
+                'new_objects': copy_stats['files_copied'],
+                'new_bytes': copy_stats['bytes_copied'],
+                'seconds': copy_stats['seconds'],
+                'bytes_per_sec': copy_stats['bytes_per_sec']
+            }
+
+            manifest = {
+                'version': 1,
+                'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'profile': profile.name if profile is not None else None,
+                'dirs': sorted(dirs),
+                'files': dict(sorted(files.items()))
+            }
+            os.makedirs(snapshot_dir, exist_ok=True)
+            manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+            tmp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, manifest_path)
+            self._save_hash_cache()
+            stats['manifest_hash'] = self.manifest_digest(manifest)
+            return stats
+
+    def list_snapshots(self):
+        """Names of the snapshot directories in this store"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted(name for name in names
+                      if not name.startswith('.') and self.is_snapshot(os.path.join(self.root, name)))
+
+    def touch_snapshot(self, snapshot_dir):
+        """Mark a snapshot as just used (its manifest mtime is the last-use time)"""
+        os.utime(os.path.join(snapshot_dir, MANIFEST_NAME))
+
+    def delete_snapshot(self, snapshot_dir):
+        """Remove a snapshot directory; its objects are freed by the next gc()"""
+        with self._lock:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    def gc(self):
+        """Delete objects no snapshot in this store refers to; returns bytes freed"""
+        with self._lock:
+            referenced = set()
+            try:
+                entries = os.listdir(self.root)
+            except OSError:
+                return 0
+            for name in entries:
+                snapshot_dir = os.path.join(self.root, name)
+                if name.startswith('.') or not self.is_snapshot(snapshot_dir):
+                    continue
+                try:
+                    manifest = self.read_manifest(snapshot_dir)
+                except (OSError, ValueError):
+                    return 0  # never collect while a manifest is unreadable
+                referenced.update(entry['hash'] for entry in manifest['files'].values())
+
+            freed = 0
+            if not os.path.isdir(self.objects_dir):
+                return 0
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                for name in os.listdir(prefix_dir):
+                    if prefix + name in referenced:
+                        continue
+                    path = os.path.join(prefix_dir, name)
+                    try:
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        pass
+            return freed
@@ -0,0 +1,108 @@
+import os
+import sys
+import errno
+import uuid
+import shutil
+from core.file_clone import clone_file
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 1 << 1
+
+_renameat2 = None
+
+def _load_renameat2():
+    """Look up glibc's renameat2 once (None where it is unavailable)"""
+    global _renameat2
+    if _renameat2 is None:
+        _renameat2 = False
+        if sys.platform.startswith('linux'):
+            try:
+                import ctypes
+                import ctypes.util
+                libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+                func = libc.renameat2
+                func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+                func.restype = ctypes.c_int
+                _renameat2 = (ctypes, func)
+            except (OSError, AttributeError):
+                pass
+    return _renameat2 or None
+
+def exchange_paths(path_a, path_b):
+    """Atomically exchange two paths with renameat2(RENAME_EXCHANGE); False if unsupported"""
+    loaded = _load_renameat2()
+    if loaded is None:
+        return False
+    ctypes, renameat2 = loaded
+    result = renameat2(AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE)
+    if result != 0:
+        error = ctypes.get_errno()
+        # The filesystem or kernel does not support exchanging
+        if error in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+            return False
+        raise OSError(error, os.strerror(error), path_a, None, path_b)
+    return True
+
+def _copy_symlink(src, dest):
+    os.symlink(os.readlink(src), dest, target_is_directory=os.path.isdir(src))
+
+def link_tree(source_dir, target_dir):
+    """Recreate source_dir under target_dir using hard links (clones where linking fails)
+
+    Symlinks (to files or directories) are recreated as symlinks with the
+    same target, so the staging tree holds exactly what the live one did.
+    """
+    linked = 0
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        rel_dir = os.path.relpath(dirpath, source_dir)
+        dest_dir = target_dir if rel_dir == '.' else os.path.join(target_dir, rel_dir)
+        os.makedirs(dest_dir, exist_ok=True)
+        for dirname in [name for name in dirnames if os.path.islink(os.path.join(dirpath, name))]:
+            dirnames.remove(dirname)
+            _copy_symlink(os.path.join(dirpath, dirname), os.path.join(dest_dir, dirname))
+        for filename in filenames:
+            src = os.path.join(dirpath, filename)
+            dest = os.path.join(dest_dir, filename)
+            if os.path.islink(src):
+                _copy_symlink(src, dest)
+                continue
+            try:
+                os.link(src, dest)
+                linked += 1
+            except OSError:
+                clone_file(src, dest)
+                shutil.copystat(src, dest)
+    return linked
+
+STAGING_PREFIX = '.riot-switcher-staging-'
+
+def make_staging_dir(live_dir):
+    """Return a fresh staging path beside live_dir (same filesystem, so renames are atomic)"""
+    parent = os.path.dirname(live_dir)
+    return os.path.join(parent, f'{STAGING_PREFIX}{uuid.uuid4().hex[:8]}')
+
+def find_stale_staging_dirs(live_dir):
+    """List staging/old trees left beside live_dir by an interrupted swap"""
+    parent = os.path.dirname(live_dir)
+    try:
+        names = os.listdir(parent)
+    except OSError:
+        return []
+    return [os.path.join(parent, name) for name in names if name.startswith(STAGING_PREFIX)]
+
+def swap_in(staging_dir, live_dir):
+    """Put staging_dir in place of live_dir in one step
+
+    Returns the path now holding the previous live tree (to be deleted later),
+    or None if there was no live tree.
+    """
+    if not os.path.exists(live_dir):
+        os.rename(staging_dir, live_dir)
+        return None
+    if exchange_paths(staging_dir, live_dir):
+        return staging_dir
+    # Portable fallback: two renames with only a tiny gap between them
+    old_dir = f'{staging_dir}-old'
+    os.rename(live_dir, old_dir)
+    os.rename(staging_dir, live_dir)
+    return old_dir
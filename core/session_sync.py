@@ -0,0 +1,165 @@
+import os
+import shutil
+import hashlib
+from collections import namedtuple
+from core.file_clone import clone_file
+from core.parallel_copy import ParallelCopier
+
+# One file of a restore source. `source` is the path to copy bytes from and
+# `digest` the sha256 of its content when already known (None otherwise).
+SyncEntry = namedtuple('SyncEntry', ['size', 'mtime_ns', 'digest', 'source'])
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def tree_digest(listing):
+    """Stable digest of {rel_path: (size, mtime_ns)}; it changes whenever any file does"""
+    digest = hashlib.sha256()
+    for rel_path in sorted(listing):
+        size, mtime_ns = listing[rel_path]
+        digest.update(f"{rel_path}\0{size}\0{mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def _prune_walk(dirpath, dirnames, root, profile):
+    """Drop subdirectories a capture profile can never need from an os.walk"""
+    if profile is None:
+        return
+    rel_dir = os.path.relpath(dirpath, root)
+    prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+    dirnames[:] = [name for name in dirnames if profile.may_contain(prefix + name)]
+
+def entries_from_directory(source_dir, skip=(), profile=None):
+    """Build (files, dirs) sync entries from a plain directory tree
+
+    With a capture profile (see core.capture_profiles) only the files it
+    covers are listed, and directories it can never need are not walked.
+    """
+    files = {}
+    dirs = set()
+    for dirpath, dirnames, filenames in os.walk(source_dir):
+        _prune_walk(dirpath, dirnames, source_dir, profile)
+        rel_dir = os.path.relpath(dirpath, source_dir)
+        if rel_dir != '.':
+            dirs.add(rel_dir.replace(os.sep, '/'))
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            if rel_path in skip:
+                continue
+            if profile is not None and not profile.matches(rel_path):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[rel_path] = SyncEntry(st.st_size, st.st_mtime_ns, None, path)
+    if profile is not None:
+        return profile.select(files, dirs)
+    return files, dirs
+
+def scan_live(target_dir, profile=None):
+    """Return ({rel_path: (size, mtime_ns)}, {rel_dir}) for the tree at target_dir
+
+    With a capture profile only the paths it covers are returned, so callers
+    never delete or overwrite anything outside it.
+    """
+    files = {}
+    dirs = set()
+    for dirpath, dirnames, filenames in os.walk(target_dir):
+        _prune_walk(dirpath, dirnames, target_dir, profile)
+        rel_dir = os.path.relpath(dirpath, target_dir)
+        if rel_dir != '.':
+            rel_dir = rel_dir.replace(os.sep, '/')
+            if profile is None or profile.covers_dir(rel_dir):
+                dirs.add(rel_dir)
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, target_dir).replace(os.sep, '/')
+            if profile is not None and not profile.matches(rel_path):
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            files[rel_path] = (st.st_size, st.st_mtime_ns)
+    return files, dirs
+
+def remove_extraneous(target_dir, live_files, live_dirs, keep_files, keep_dirs):
+    """Delete live files/directories that are not being kept; returns files deleted"""
+    deleted = 0
+    for rel_path in sorted(set(live_files) - set(keep_files), reverse=True):
+        try:
+            os.remove(os.path.join(target_dir, *rel_path.split('/')))
+            deleted += 1
+        except OSError:
+            pass
+    for rel_dir in sorted(set(live_dirs) - set(keep_dirs), key=len, reverse=True):
+        path = os.path.join(target_dir, *rel_dir.split('/'))
+        try:
+            os.rmdir(path)
+        except OSError:
+            shutil.rmtree(path, ignore_errors=True)
+    return deleted
+
+def write_file(dest, source, mtime_ns):
+    """Write a file from a path or binary file object, stamped with mtime_ns
+
+    The data goes to a temp file beside dest that is renamed over it, so a
+    file that is hard-linked elsewhere (see session_swap.link_tree) is never
+    modified in place. Paths are cloned (copy-on-write where the filesystem
+    supports it, see core.file_clone).
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = dest + '.rs-tmp'
+    if isinstance(source, str):
+        clone_file(source, tmp_path)
+    else:
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp_path, dest)
+
+def sync_tree(files, dirs, target_dir, verify_hash=False, profile=None, workers=None):
+    """Make target_dir identical to the given entries, touching only what differs
+
+    Files whose size and mtime already match are left alone (with verify_hash
+    their content hash must match too). Changed files are copied by `workers`
+    threads (see core.parallel_copy), extraneous files and directories are
+    deleted; with a capture profile only within the paths it covers.
+    Returns a stats dict.
+    """
+    stats = {'files_copied': 0, 'bytes_written': 0, 'files_unchanged': 0, 'files_deleted': 0}
+    os.makedirs(target_dir, exist_ok=True)
+    live_files, live_dirs = scan_live(target_dir, profile)
+
+    # Deletions first so a path can change between file and directory
+    stats['files_deleted'] = remove_extraneous(target_dir, live_files, live_dirs, files, dirs)
+
+    for rel_dir in sorted(dirs, key=len):
+        os.makedirs(os.path.join(target_dir, *rel_dir.split('/')), exist_ok=True)
+
+    def sync_file(rel_path):
+        entry = files[rel_path]
+        dest = os.path.join(target_dir, *rel_path.split('/'))
+        if rel_path in matching:
+            expected = entry.digest or file_sha256(entry.source)
+            if file_sha256(dest) == expected:
+                return None
+        write_file(dest, entry.source, entry.mtime_ns)
+        return entry.size
+
+    # Files whose size and mtime match only need a job when hashes are checked
+    matching = {rel_path for rel_path, entry in files.items()
+                if live_files.get(rel_path) == (entry.size, entry.mtime_ns)}
+    candidates = [rel_path for rel_path in files if verify_hash or rel_path not in matching]
+    copy_stats = ParallelCopier(workers).run(sync_file, candidates)
+    stats['files_copied'] = copy_stats['files_copied']
+    stats['bytes_written'] = copy_stats['bytes_copied']
+    stats['files_unchanged'] = len(files) - copy_stats['files_copied']
+    stats['seconds'] = copy_stats['seconds']
+    stats['bytes_per_sec'] = copy_stats['bytes_per_sec']
+    return stats
@@ -0,0 +1,233 @@
+import os
+import sys
+import abc
+import threading
+import select
+import struct
+from core.trash import TRASH_DIR_NAME
+from core.session_swap import STAGING_PREFIX
+
+# The parts of the Riot config tree whose changes mean "session may have changed"
+WATCHED_SUBDIRS = [
+    '',
+    'Riot Client',
+    os.path.join('Riot Client', 'Data'),
+    os.path.join('Riot Client', 'Plugins'),
+]
+
+# The app's own trash and swap staging folders beside 'Riot Client' churn
+# during every switch and purge; their events are not session changes
+IGNORED_PREFIXES = (TRASH_DIR_NAME, STAGING_PREFIX)
+
+# Paths whose stat signature the polling backend compares between polls
+POLLED_PATHS = [
+    os.path.join('Riot Client', 'RiotGamesPrivateSettings.yaml'),
+    os.path.join('Riot Client', 'RiotClientPrivateSettings.yaml'),
+    os.path.join('Riot Client', 'Data', 'RiotGamesPrivateSettings.yaml'),
+    os.path.join('Riot Client', 'Data', 'RiotClientPrivateSettings.yaml'),
+    os.path.join('Riot Client', 'RSOData'),
+    os.path.join('Riot Client', 'Plugins', 'Authentication'),
+]
+
+class SessionWatcher(abc.ABC):
+    """Base class for watchers of the Riot config directory
+
+    Backends call self.callback() (from their own thread) once a burst of
+    changes has settled for `debounce` seconds.
+    """
+    backend = 'none'
+
+    def __init__(self, config_dir, callback, debounce=0.1):
+        self.config_dir = config_dir
+        self.callback = callback
+        self.debounce = debounce
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start watching on a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"session-watcher-{self.backend}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and wait for the thread to exit"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"Error in session watcher callback: {e}")
+
+    @abc.abstractmethod
+    def _run(self):
+        """Watch until self._stop_event is set, calling self._notify() on changes"""
+
+class PollingWatcher(SessionWatcher):
+    """Fallback backend: compares a cheap stat signature every `interval` seconds"""
+    backend = 'polling'
+
+    def __init__(self, config_dir, callback, debounce=0.1, interval=5.0):
+        super().__init__(config_dir, callback, debounce)
+        self.interval = interval
+
+    def _signature(self):
+        signature = []
+        for rel_path in POLLED_PATHS:
+            try:
+                st = os.stat(os.path.join(self.config_dir, rel_path))
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _run(self):
+        last = self._signature()
+        while not self._stop_event.wait(self.interval):
+            current = self._signature()
+            if current != last:
+                last = current
+                self._notify()
+
+class InotifyWatcher(SessionWatcher):
+    """Linux backend: blocks on inotify, so it costs nothing while idle"""
+    backend = 'inotify'
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, config_dir, callback, debounce=0.1):
+        super().__init__(config_dir, callback, debounce)
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._watches = {}  # wd -> (path, wanted child name or None)
+
+    @classmethod
+    def is_supported(cls):
+        return sys.platform.startswith('linux')
+
+    def stop(self):
+        self._stop_event.set()
+        try:
+            os.write(self._wakeup_w, b'x')
+        except OSError:
+            pass
+        super().stop()
+        for fd in (self._fd, self._wakeup_r, self._wakeup_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _arm(self):
+        """Watch each interesting directory, or its nearest existing ancestor
+
+        A watch on a stand-in ancestor only reacts to the child name that leads
+        towards the missing directory, so unrelated churn is ignored.
+        """
+        for subdir in WATCHED_SUBDIRS:
+            path = os.path.join(self.config_dir, subdir) if subdir else self.config_dir
+            wanted_child = None
+            while not os.path.isdir(path):
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                wanted_child = os.path.basename(path)
+                path = parent
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+            if wd >= 0:
+                existing = self._watches.get(wd)
+                if existing is None or existing[1] is not None:
+                    self._watches[wd] = (path, wanted_child)
+
+    def _read_events(self):
+        """Drain pending events; return (relevant, needs_rearm)"""
+        relevant = False
+        rearm = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + self.EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+                name_start = offset + self.EVENT_HEADER.size
+                name = os.fsdecode(data[name_start:name_start + name_len].rstrip(b'\0'))
+                offset = name_start + name_len
+                watch = self._watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    rearm = True
+                    continue
+                if watch is not None and watch[1] is not None:
+                    # Stand-in ancestor: only the missing child appearing matters
+                    if name == watch[1]:
+                        relevant = True
+                        rearm = True
+                    continue
+                if name.startswith(IGNORED_PREFIXES):
+                    continue
+                relevant = True
+                if mask & (self.IN_ISDIR | self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                    rearm = True
+        return relevant, rearm
+
+    def _run(self):
+        self._arm()
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self._fd, self._wakeup_r], [], [])
+            if self._stop_event.is_set():
+                break
+            if self._fd not in ready:
+                continue
+            relevant, rearm = self._read_events()
+            # Let the burst settle so one switch produces one notification
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([self._fd, self._wakeup_r], [], [], self.debounce)
+                if self._fd not in ready:
+                    break
+                more_relevant, more_rearm = self._read_events()
+                relevant = relevant or more_relevant
+                rearm = rearm or more_rearm
+            if rearm:
+                self._arm()
+            if relevant and not self._stop_event.is_set():
+                self._notify()
+
+def create_session_watcher(config_dir, callback, debounce=0.1, poll_interval=5.0):
+    """Pick the best available watcher backend, falling back to polling"""
+    if InotifyWatcher.is_supported():
+        try:
+            return InotifyWatcher(config_dir, callback, debounce)
+        except Exception as e:
+            print(f"inotify unavailable, falling back to polling: {e}")
+    return PollingWatcher(config_dir, callback, debounce, interval=poll_interval)
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import uuid
+
+JOURNAL_NAME = 'switch_journal.jsonl'
+
+def _fsync_dir(path):
+    """Make a file's creation durable (not possible, nor needed, on Windows)"""
+    if sys.platform == 'win32':
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _process_start_time(pid):
+    """Creation time of process pid, or None if it is gone or not ours to inspect"""
+    import psutil
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return None
+
+
+class SwitchJournal:
+    """Write-ahead log of the switch in progress
+
+    Each switch rewrites the journal: a 'begin' record, one record before
+    (and for clear and restore also after) every phase with the paths it
+    touches, and an 'end' record. Every record is flushed and fsynced
+    before the work it describes starts, so after a crash the journal tells
+    exactly how far the switch got. A journal without an 'end' record
+    belongs to a switch that never finished.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def begin(self, **fields):
+        """Start the journal of a new switch
+
+        Raises RuntimeError if another live process is in the middle of a
+        switch on the same data folder.
+        """
+        records = self.incomplete()
+        if records and self.owner_alive(records):
+            raise RuntimeError(f"Process {records[0]['pid']} is switching accounts right now")
+        self.close()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+        self.record('begin', id=uuid.uuid4().hex[:12], pid=os.getpid(),
+                    pid_started=_process_start_time(os.getpid()),
+                    time=time.strftime("%Y-%m-%dT%H:%M:%S"), **fields)
+
+    def record(self, event, **fields):
+        """Append one record and make it durable before returning"""
+        if self._file is None:
+            self._open_for_append()
+        fields['event'] = event
+        self._file.write(json.dumps(fields) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _open_for_append(self):
+        """Reopen an existing journal, dropping a torn last line a crash left behind"""
+        try:
+            with open(self.path, 'r+b') as f:
+                data = f.read()
+                if data and not data.endswith(b'\n'):
+                    f.truncate(data.rfind(b'\n') + 1)
+        except FileNotFoundError:
+            pass
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def end(self, outcome, **fields):
+        """Mark the switch as finished (outcome 'done', 'cancelled', 'recovered', ...)"""
+        self.record('end', outcome=outcome, **fields)
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read(self):
+        """All records of the last switch; a torn last line from a crash is skipped"""
+        records = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        except OSError:
+            return []
+        return records
+
+    def incomplete(self):
+        """The records of a switch that began but never ended, or None"""
+        records = self.read()
+        if not records or records[0].get('event') != 'begin':
+            return None
+        if any(record.get('event') == 'end' for record in records):
+            return None
+        return records
+
+    def owner_alive(self, records):
+        """True if the process that wrote the journal is still running (and is not us)
+
+        The pid alone is not enough: after a reboot or a wraparound another
+        process may have it, so its creation time has to match as well.
+        """
+        pid = records[0].get('pid')
+        started = records[0].get('pid_started')
+        if not pid or pid == os.getpid() or started is None:
+            return False
+        current = _process_start_time(pid)
+        return current is not None and abs(current - started) < 0.01
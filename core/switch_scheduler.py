@@ -0,0 +1,287 @@
+import time
+import uuid
+import threading
+from collections import deque
+
+DEFAULT_TIMEOUT = 120.0  # seconds a switch may run before it is cancelled
+METRIC_SAMPLES = 50
+
+class SwitchRequest:
+    """One requested switch, from being queued until it has finished
+
+    status is 'queued', 'running', then one of 'done', 'failed',
+    'cancelled', 'timed_out' or 'error'. Requests coalesced into this one
+    share its outcome; `sources` lists who asked.
+    """
+    FINAL = ('done', 'failed', 'cancelled', 'timed_out', 'error')
+
+    def __init__(self, account, source, timeout):
+        self.id = uuid.uuid4().hex[:8]
+        self.account = account
+        self.sources = [source]
+        self.timeout = timeout
+        self.status = 'queued'
+        self.error = None
+        self.trace = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def ok(self):
+        return self.status == 'done'
+
+    def cancel(self):
+        """Stop the switch at its next phase boundary (or before it starts)"""
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the switch has finished; returns self"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Switch {self.id} did not finish in time")
+        return self
+
+    def wait_ms(self):
+        end = self.started or self.finished or time.monotonic()
+        return round((end - self.submitted) * 1000, 3)
+
+    def run_ms(self):
+        if self.started is None:
+            return None
+        return round(((self.finished or time.monotonic()) - self.started) * 1000, 3)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'ok': self.ok,
+            'status': self.status,
+            'account': self.account['display_name'],
+            'sources': list(self.sources),
+            'wait_ms': self.wait_ms(),
+            'run_ms': self.run_ms(),
+            'error': self.error,
+            'breakdown': self.trace
+        }
+
+
+class SwitchScheduler:
+    """Owns the one worker thread every account switch runs on
+
+    Nothing else calls RiotClient.switch_account, so two switches can never
+    work on the 'Riot Client' folder at the same time. At most one request
+    waits behind the running one; newer requests replace its target, so a
+    burst of clicks or scripted triggers ends on the latest account without
+    switching through the ones in between. A request for another account
+    also cancels the running switch at its next phase boundary (unless
+    preempt is off); one for the same account joins it. A switch still
+    running after its timeout is cancelled the same way.
+
+    Listeners are called as listener(event, request, *details), with
+    event 'queued', 'started', 'progress' (details: phase, message) or
+    'finished'. 'started' and 'progress' come from the worker thread;
+    'queued', and 'finished' for a request cancelled before it started,
+    come from the thread that called request() or cancel(). Listeners
+    must not assume a particular thread (the GUI's re-emits Qt signals).
+    """
+    def __init__(self, riot_client, account_manager=None, timeout=DEFAULT_TIMEOUT, preempt=True):
+        self.riot_client = riot_client
+        self.account_manager = account_manager  # marks accounts used after a switch
+        self.timeout = timeout
+        self.preempt = preempt
+        self.listeners = []
+        self._cond = threading.Condition()
+        self._queued = None
+        self._current = None
+        self._thread = None
+        self._stopped = False
+        self._counts = dict.fromkeys(('requested', 'coalesced', 'preempted', 'done', 'failed',
+                                      'cancelled', 'timed_out', 'error'), 0)
+        self._wait_ms = deque(maxlen=METRIC_SAMPLES)
+        self._run_ms = deque(maxlen=METRIC_SAMPLES)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, event, request, *details):
+        for listener in list(self.listeners):
+            try:
+                listener(event, request, *details)
+            except Exception as e:
+                print(f"Error in switch listener: {e}")
+
+    @staticmethod
+    def _same_account(a, b):
+        return a['display_name'] == b['display_name']
+
+    def request(self, account, source=None, timeout=None):
+        """Ask for a switch to account; returns the SwitchRequest that will carry it out"""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Switch scheduler is stopped")
+            self._counts['requested'] += 1
+            current = self._current
+            if self._queued is not None:
+                request = self._queued
+                request.account = account
+                request.sources.append(source)
+                self._counts['coalesced'] += 1
+            elif current is not None and not current.is_cancelled() and self._same_account(current.account, account):
+                current.sources.append(source)
+                self._counts['coalesced'] += 1
+                return current
+            else:
+                request = SwitchRequest(account, source, self.timeout if timeout is None else timeout)
+                self._queued = request
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='switch-scheduler', daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+            if (self.preempt and current is not None and not current.is_cancelled()
+                    and not self._same_account(current.account, account)):
+                current.cancel()
+                self._counts['preempted'] += 1
+        self._notify('queued', request)
+        return request
+
+    def cancel(self):
+        """Cancel the waiting request and the running switch; returns how many were cancelled"""
+        with self._cond:
+            queued, self._queued = self._queued, None
+            current = self._current
+            cancelled = 0
+            if current is not None and not current.is_cancelled():
+                current.cancel()
+                cancelled += 1
+        if queued is not None:
+            queued.cancel()
+            self._finish(queued, 'cancelled')
+            cancelled += 1
+        return cancelled
+
+    def is_busy(self):
+        with self._cond:
+            return self._current is not None or self._queued is not None
+
+    def current(self):
+        """The running request, or None"""
+        with self._cond:
+            return self._current
+
+    def metrics(self):
+        """Queue depth, wait and run times (ms) and outcome counters"""
+        with self._cond:
+            waits, runs = list(self._wait_ms), list(self._run_ms)
+            metrics = {
+                'queue_depth': int(self._queued is not None),
+                'in_flight': int(self._current is not None),
+                'current': self._current.account['display_name'] if self._current else None
+            }
+            metrics.update(self._counts)
+        metrics['wait_ms'] = {
+            'last': waits[-1] if waits else None,
+            'mean': round(sum(waits) / len(waits), 3) if waits else None,
+            'max': max(waits) if waits else None
+        }
+        metrics['run_ms'] = {
+            'last': runs[-1] if runs else None,
+            'mean': round(sum(runs) / len(runs), 3) if runs else None,
+            'max': max(runs) if runs else None
+        }
+        return metrics
+
+    def stop(self, timeout=None):
+        """Cancel what is queued or running, let the worker exit and wait for it
+
+        A running switch stops at its next phase boundary; one that has
+        cleared the live session finishes its restore first. Call this
+        before closing the account database. Returns False if the worker
+        was still running after timeout seconds.
+        """
+        self.cancel()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._queued is None and not self._stopped:
+                    self._cond.wait()
+                if self._queued is None:
+                    self._thread = None
+                    return
+                request, self._queued = self._queued, None
+                self._current = request
+                request.status = 'running'
+                request.started = time.monotonic()
+                self._wait_ms.append(request.wait_ms())
+            self._notify('started', request)
+            status = 'error'
+            try:
+                status = self._execute(request)
+            except Exception as e:
+                # The worker must survive anything a switch throws, or every
+                # later request would wait forever
+                request.error = f"{type(e).__name__}: {e}"
+            finally:
+                with self._cond:
+                    self._current = None
+                self._finish(request, status)
+
+    def _execute(self, request):
+        """Run one switch on this thread; returns its final status"""
+        timed_out = []
+        deadline = request.started + request.timeout if request.timeout else None
+
+        def cancel_check():
+            if request.is_cancelled():
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                timed_out.append(True)
+                return True
+            return False
+
+        def progress(phase, message):
+            self._notify('progress', request, phase, message)
+
+        if cancel_check():
+            return 'timed_out' if timed_out else 'cancelled'
+        try:
+            success = self.riot_client.switch_account(request.account, progress_callback=progress,
+                                                      cancel_check=cancel_check)
+        except Exception as e:
+            request.error = f"{type(e).__name__}: {e}"
+            return 'error'
+        finally:
+            request.trace = self.riot_client.instrumentation.last_trace('switch')
+
+        if success:
+            if self.account_manager is not None and 'id' in request.account:
+                try:
+                    self.account_manager.mark_account_used(request.account['id'])
+                except Exception as e:
+                    print(f"Error marking {request.account['display_name']} as used: {e}")
+            return 'done'
+        if timed_out:
+            return 'timed_out'
+        return 'cancelled' if request.is_cancelled() else 'failed'
+
+    def _finish(self, request, status):
+        request.status = status
+        request.finished = time.monotonic()
+        with self._cond:
+            self._counts[status] += 1
+            if request.started is not None:
+                self._run_ms.append(request.run_ms())
+        request._done.set()
+        self._notify('finished', request)
@@ -0,0 +1,106 @@
+import os
+import sys
+import uuid
+import shutil
+import threading
+
+TRASH_DIR_NAME = '.riot-switcher-trash'
+
+# Windows SetThreadPriority mode that also lowers the thread's I/O priority
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+# macOS setiopolicy_np arguments
+IOPOL_TYPE_DISK = 0
+IOPOL_SCOPE_THREAD = 1
+IOPOL_THROTTLE = 3
+
+def lower_thread_io_priority():
+    """Best effort: make the calling thread's disk I/O yield to everything else"""
+    try:
+        if sys.platform.startswith('linux'):
+            import psutil
+            # Linux I/O priorities are per thread, and psutil accepts thread ids
+            psutil.Process(threading.get_native_id()).ionice(psutil.IOPRIO_CLASS_IDLE)
+        elif sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        elif sys.platform == 'darwin':
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or None)
+            libc.setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE)
+    except Exception:
+        pass  # purging at normal priority is still correct
+
+class TrashBin:
+    """Move-now, delete-later bin for session files
+
+    move() renames a file or directory into a trash folder on the same
+    filesystem, which is a single metadata operation however large the
+    tree is. The actual deletion happens on one background thread running
+    at idle I/O priority, so it never competes with a switch.
+    """
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+
+    def move(self, path):
+        """Rename path into the trash; returns its new location
+
+        Raises OSError if it cannot be renamed (e.g. it is in use); the
+        caller decides whether to delete it in place instead.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        trashed = os.path.join(self.root, f'{uuid.uuid4().hex[:12]}-{os.path.basename(path.rstrip(os.sep))}')
+        os.rename(path, trashed)
+        return trashed
+
+    def purge(self):
+        """Delete everything in the trash now; returns the number of entries removed"""
+        removed = 0
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def purge_in_background(self):
+        """Start (or re-arm) the background purge; returns its thread"""
+        with self._lock:
+            self._pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._purge_worker, daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def wait(self, timeout=None):
+        """Block until the background purge (if any) has finished; False on timeout"""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def _purge_worker(self):
+        lower_thread_io_priority()
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            # Anything moved in while this pass runs re-arms _pending
+            self.purge()
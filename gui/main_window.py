@@ -1,18 +1,44 @@
-import os
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QListWidget, 
-                             QMessageBox, QListWidgetItem)
-from PyQt6.QtCore import Qt, QTimer
+                             QMessageBox, QListWidgetItem, QApplication)
+from PyQt6.QtCore import Qt, QTimer, QObject, pyqtSignal
 from PyQt6.QtGui import QFont
 from core.account_manager import AccountManager
 from core.riot_client import RiotClient
+from core.session_watcher import create_session_watcher
+from core.control_server import ControlServer, make_handlers, default_address
+from core.switch_scheduler import SwitchScheduler
 from gui.account_dialog import AccountDialog
+from gui.switch_worker import SwitchBridge, SessionTasks
+
+class SessionSignals(QObject):
+    """Carries session watcher events from the watcher thread to the GUI thread"""
+    changed = pyqtSignal()
+
+class ControlSignals(QObject):
+    """Tells the GUI thread that a control server request changed accounts or sessions"""
+    changed = pyqtSignal()
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.account_manager = AccountManager()
-        self.riot_client = RiotClient()
+        self.riot_client = RiotClient(session_index=self.account_manager)
+        # Disk scans and the first status check wait until the window has painted
+        self.startup_finished = False
+        self.control_server = None
+        
+        # Every switch (from here or the control server) runs on the
+        # scheduler's one worker thread, so the UI never blocks
+        self.switch_scheduler = SwitchScheduler(self.riot_client, self.account_manager)
+        self.switch_bridge = SwitchBridge()
+        self.switch_bridge.started.connect(self.on_switch_started)
+        self.switch_bridge.progress.connect(self.on_switch_progress)
+        self.switch_bridge.finished.connect(self.on_switch_finished)
+        self.switch_scheduler.add_listener(self.switch_bridge)
+        # Backups, logouts and clears run on a worker too, one at a time
+        self.session_tasks = SessionTasks()
+        
         self.init_ui()
         self.setup_timer()
         
@@ -120,6 +146,13 @@ class MainWindow(QMainWindow):
         self.current_account_label.setStyleSheet("color: #cccccc; font-size: 11px;")
         status_layout.addWidget(self.current_account_label)
         
+        # Per-phase timings of the most recent switch (filled in after one finishes)
+        self.last_switch_label = QLabel("")
+        self.last_switch_label.setStyleSheet("color: #888888; font-size: 10px;")
+        self.last_switch_label.setWordWrap(True)
+        self.last_switch_label.hide()
+        status_layout.addWidget(self.last_switch_label)
+        
         layout.addWidget(status_frame)
         
         # Main accounts section
@@ -219,6 +252,13 @@ class MainWindow(QMainWindow):
         """)
         right_panel.addWidget(self.switch_btn)
         
+        self.cancel_switch_btn = QPushButton("✖ Cancel Switch")
+        self.cancel_switch_btn.clicked.connect(self.cancel_switch)
+        self.cancel_switch_btn.setFixedHeight(30)
+        self.cancel_switch_btn.setStyleSheet("QPushButton { background-color: #f44336; color: white; border-radius: 4px; border: none; }")
+        self.cancel_switch_btn.hide()
+        right_panel.addWidget(self.cancel_switch_btn)
+        
         self.login_help_btn = QPushButton("� Setup Guide")
         self.login_help_btn.clicked.connect(self.show_login_guide)
         self.login_help_btn.setEnabled(False)
@@ -304,6 +344,12 @@ class MainWindow(QMainWindow):
         self.clear_session_btn.setStyleSheet("QPushButton { background-color: #FF5722; color: white; border-radius: 4px; }")
         bottom_toolbar.addWidget(self.clear_session_btn)
         
+        self.storage_btn = QPushButton("📦 Storage")
+        self.storage_btn.clicked.connect(self.show_storage_usage)
+        self.storage_btn.setFixedHeight(24)
+        self.storage_btn.setToolTip("Show disk space used by session backups")
+        bottom_toolbar.addWidget(self.storage_btn)
+        
         bottom_toolbar.addStretch()  # Push buttons to left
         
         layout.addLayout(bottom_toolbar)
@@ -318,21 +364,110 @@ class MainWindow(QMainWindow):
         self.load_accounts()
         
     def setup_timer(self):
-        """Setup timer to periodically check Riot Client status"""
+        """Setup the session watcher and the timer that checks Riot Client status"""
+        # Session state only changes when the config directory does, so it is
+        # pushed by the watcher instead of being re-read on every tick
+        self.session_state = None  # (is_logged_in, current_user)
+        self.session_signals = SessionSignals()
+        self.session_signals.changed.connect(self.on_session_changed)
+        self.session_watcher = create_session_watcher(
+            self.riot_client.riot_paths['config'],
+            self.session_signals.changed.emit
+        )
+        
+        # Process start/stop is not a filesystem event, so keep a cheap timer for it
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_riot_status)
+        
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_finished:
+            # A zero timer runs once the event loop has painted the window
+            QTimer.singleShot(0, self.finish_startup)
+            
+    def finish_startup(self):
+        """Work left out of __init__ so the window paints first: index, watcher, status"""
+        if self.startup_finished:
+            return
+        self.startup_finished = True
+        self.recover_interrupted_switch()
+        if self.account_manager.sessions_index_created:
+            # First run with the sessions table: index the backups already on disk
+            self.riot_client.rebuild_session_index()
+            self.load_accounts()
+        self.session_watcher.start()
         self.timer.start(5000)  # Check every 5 seconds
         self.update_riot_status()  # Initial check
+        self.start_control_server()
         
-    def update_riot_status(self):
+    def recover_interrupted_switch(self):
+        """Repair the live session if the app died in the middle of a switch"""
+        recovery = self.riot_client.recover_interrupted_switch()
+        if recovery is None:
+            return
+        messages = {
+            'none': "Interrupted switch had not changed anything",
+            'rolled_forward': f"Finished the interrupted switch to {recovery['account']}",
+            'rolled_back': f"Undid the interrupted switch to {recovery['account']}"
+        }
+        if recovery['action'] in messages:
+            self.statusBar().showMessage(messages[recovery['action']], 5000)
+        else:
+            QMessageBox.warning(self, "Switch Recovery",
+                                f"The switch to {recovery['account']} was interrupted and could not be "
+                                "repaired. Log in again or switch to a saved account.")
+            
+    def start_control_server(self):
+        """Let scripts and stream decks drive this window (see core.control_server)"""
+        self.control_signals = ControlSignals()
+        self.control_signals.changed.connect(self.on_remote_change)
+        handlers = make_handlers(self.account_manager, self.riot_client, self.control_signals.changed.emit,
+                                 self.switch_scheduler)
+        self.control_server = ControlServer(handlers, default_address(self.riot_client.data_dir))
+        try:
+            self.control_server.start()
+        except OSError as e:
+            print(f"Control server not started: {e}")
+            self.control_server = None
+            
+    def on_remote_change(self):
+        """Show what a backup or logout requested over the control server did"""
+        self.load_accounts()
+        self.riot_client.process_tracker.invalidate()
+        self.update_riot_status(refresh_session=True)
+        
+    def on_session_changed(self):
+        """Refresh the status as soon as the watcher reports a config change"""
+        # Config writes usually mean the client started or stopped, so rescan too
+        self.riot_client.process_tracker.invalidate()
+        self.update_riot_status(refresh_session=True)
+        
+    def closeEvent(self, event):
+        self.session_watcher.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
+        # A switch in progress is stopped at its next safe point, never half
+        # restored, and a running backup, logout or clear is finished
+        if self.switch_scheduler.is_busy() or self.session_tasks.is_busy():
+            self.statusBar().showMessage("Finishing the current operation...", 0)
+            QApplication.processEvents()
+        self.switch_scheduler.stop()
+        self.session_tasks.stop()
+        self.account_manager.close()
+        super().closeEvent(event)
+        
+    def update_riot_status(self, refresh_session=False):
         """Update the Riot Client status display"""
         try:
             is_running = self.riot_client.is_running()
-            is_logged_in = self.riot_client.is_logged_in()
+            if refresh_session or self.session_state is None:
+                is_logged_in = self.riot_client.is_logged_in()
+                current_user = self.riot_client.get_current_user() if is_logged_in else None
+                self.session_state = (is_logged_in, current_user)
+            is_logged_in, current_user = self.session_state
             
             if is_running and is_logged_in:
                 self.status_label.setText("🟢 Riot Client - Active & Logged In")
-                current_user = self.riot_client.get_current_user()
                 self.current_account_label.setText(f"{current_user}")
             elif is_running:
                 self.status_label.setText("🟡 Riot Client - Running (Not Logged In)")
@@ -350,9 +485,8 @@ class MainWindow(QMainWindow):
         accounts = self.account_manager.get_all_accounts()
         
         for account in accounts:
-            # Check if account has saved session
-            account_backup_dir = self.riot_client._get_account_backup_path(account['display_name'])
-            has_session = os.path.exists(account_backup_dir)
+            # Saved-session state comes from the sessions index, not the filesystem
+            has_session = account['has_session']
             
             # Create status indicator
             if has_session:
@@ -437,13 +571,14 @@ class MainWindow(QMainWindow):
         reply = QMessageBox.question(
             self, 
             "Confirm Delete", 
-            f"Are you sure you want to delete the account '{account['display_name']}'?",
+            f"Are you sure you want to delete the account '{account['display_name']}' and its saved session?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 self.account_manager.delete_account(account_id)
+                self.riot_client.delete_account_backup(account['display_name'])
                 self.load_accounts()
                 self.statusBar().showMessage("Account deleted successfully", 3000)
             except Exception as e:
@@ -458,42 +593,135 @@ class MainWindow(QMainWindow):
         account_id = selected_items[0].data(Qt.ItemDataRole.UserRole)
         account = self.account_manager.get_account(account_id)
         
-        # Switch immediately without confirmation
-        try:
-            self.statusBar().showMessage(f"Switching to {account['display_name']}...", 0)
-            success = self.riot_client.switch_account(account)
-            if success:
-                # Mark account as used
-                self.account_manager.mark_account_used(account_id)
-                self.load_accounts()  # Refresh the list
-                
-                # Check if this was first time setup (only show message for first-time setup)
-                account_backup_dir = self.riot_client._get_account_backup_path(account['display_name'])
-                if not account_backup_dir or not os.path.exists(account_backup_dir):
-                    # Only show dialog for first-time setup guidance
-                    QMessageBox.information(
-                        self, 
-                        "First Time Setup", 
-                        f"Successfully initiated switch to {account['display_name']}!\n\n"
-                        "IMPORTANT: After logging in successfully:\n"
-                        "1. Close Riot Client\n"
-                        "2. Click '💾 Backup Session'\n"
-                        "3. Future switches will be instant!"
-                    )
-                    self.statusBar().showMessage("First-time setup initiated - follow the instructions", 8000)
-                else:
-                    # For established accounts, just show status bar message
-                    self.statusBar().showMessage(f"✅ Switched to {account['display_name']}", 4000)
+        # Switch immediately without confirmation, on the scheduler's worker.
+        # A double-click joins the running switch; picking another account
+        # while one runs retargets it to the latest choice.
+        self.statusBar().showMessage(f"Switching to {account['display_name']}...", 0)
+        self.switch_scheduler.request(account, source='gui')
+        self.set_switch_in_progress(True)
+        
+    def cancel_switch(self):
+        """Cancel the in-flight switch at its next phase boundary"""
+        if self.switch_scheduler.cancel():
+            self.cancel_switch_btn.setEnabled(False)
+            self.statusBar().showMessage("Cancelling switch...", 0)
+            
+    def set_switch_in_progress(self, in_progress):
+        """Lock the session-changing controls while a switch runs"""
+        self.cancel_switch_btn.setVisible(in_progress)
+        self.cancel_switch_btn.setEnabled(in_progress)
+        self.set_session_controls_enabled(not in_progress and not self.session_tasks.is_busy())
+        
+    def set_session_controls_enabled(self, enabled):
+        self.backup_btn.setEnabled(enabled)
+        self.logout_btn.setEnabled(enabled)
+        self.clear_session_btn.setEnabled(enabled)
+        
+    def run_session_task(self, func, on_done, on_error):
+        """Run a backup, logout or clear on the session task worker, controls locked meanwhile"""
+        def then(callback):
+            def finished(value):
+                self.set_session_controls_enabled(not self.switch_scheduler.is_busy()
+                                                  and not self.session_tasks.is_busy())
+                callback(value)
+            return finished
+        self.set_session_controls_enabled(False)
+        self.session_tasks.run(func, then(on_done), then(on_error))
+        
+    def on_session_task_failed(self, action, status, error):
+        QMessageBox.critical(self, "Error", f"Failed to {action}: {str(error)}")
+        self.statusBar().showMessage(status, 3000)
+        
+    def on_switch_started(self, request):
+        """A switch began, possibly one requested over the control server"""
+        self.set_switch_in_progress(True)
+        self.statusBar().showMessage(f"Switching to {request.account['display_name']}...", 0)
+        
+    def on_switch_progress(self, request, phase, message):
+        """Show per-phase switch progress in the status bar"""
+        self.statusBar().showMessage(f"[{phase}] {message}", 0)
+        
+    def on_switch_finished(self, request):
+        """Handle the result of a switch from the scheduler"""
+        account = request.account
+        self.set_switch_in_progress(self.switch_scheduler.is_busy())
+        self.show_last_switch_breakdown()
+        if self.switch_scheduler.is_busy():
+            return  # superseded by a newer request; its outcome is what counts
+        
+        if request.status in ('cancelled', 'timed_out'):
+            reason = "timed out" if request.status == 'timed_out' else "cancelled"
+            self.statusBar().showMessage(f"Switch to {account['display_name']} {reason}", 4000)
+            self.update_riot_status(refresh_session=True)
+            return
+            
+        if request.status == 'error':
+            QMessageBox.critical(self, "Error", f"Failed to switch account: {request.error}")
+            self.statusBar().showMessage("Switch failed", 3000)
+            return
+            
+        if request.ok:
+            # The scheduler already marked the account as used
+            self.load_accounts()  # Refresh the list
+            self.update_riot_status(refresh_session=True)
+            
+            # Check if this was first time setup (only show message for first-time setup)
+            if self.account_manager.get_session(account['display_name']) is None and 'gui' in request.sources:
+                # Only show dialog for first-time setup guidance
+                QMessageBox.information(
+                    self, 
+                    "First Time Setup", 
+                    f"Successfully initiated switch to {account['display_name']}!\n\n"
+                    "IMPORTANT: After logging in successfully:\n"
+                    "1. Close Riot Client\n"
+                    "2. Click '💾 Backup Session'\n"
+                    "3. Future switches will be instant!"
+                )
+                self.statusBar().showMessage("First-time setup initiated - follow the instructions", 8000)
             else:
-                QMessageBox.warning(self, "Switch Failed", "Failed to switch account. Please try again or check Riot Client status.")
-                self.statusBar().showMessage("Switch failed", 3000)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to switch account: {str(e)}")
+                # For established accounts, just show status bar message
+                self.statusBar().showMessage(f"✅ Switched to {account['display_name']}", 4000)
+        elif 'gui' in request.sources:
+            QMessageBox.warning(self, "Switch Failed", "Failed to switch account. Please try again or check Riot Client status.")
             self.statusBar().showMessage("Switch failed", 3000)
-                    
+        else:
+            self.statusBar().showMessage(f"Switch to {account['display_name']} failed", 4000)
+            
+    def show_last_switch_breakdown(self):
+        """Show where the time of the last switch went, phase by phase"""
+        trace = self.riot_client.instrumentation.last_trace('switch')
+        if trace is None:
+            return
+            
+        parts = []
+        details = []
+        for span in trace['spans']:
+            if span['depth'] != 1:
+                continue  # only the switch's own phases
+            part = f"{span['name']} {round(span['duration_ms'])} ms"
+            if span.get('files'):
+                part += f" ({span['files']} files)"
+            parts.append(part)
+            detail = f"{span['name']}: +{round(span['offset_ms'])} ms, {span['duration_ms']} ms"
+            if 'bytes' in span:
+                detail += f", {round(span['bytes'] / 1024, 1)} KB"
+            if not span['ok']:
+                detail += " (failed)"
+            details.append(detail)
+            
+        outcome = "cancelled" if trace.get('cancelled') else ("ok" if trace['ok'] else "failed")
+        self.last_switch_label.setText(
+            f"⏱ Last switch ({outcome}) {round(trace['duration_ms'] / 1000, 2)} s: " + " · ".join(parts)
+        )
+        self.last_switch_label.setToolTip(
+            f"Switch to {trace.get('account', '?')} at {trace['time']}\n" + "\n".join(details)
+        )
+        self.last_switch_label.show()
+        
     def refresh_status(self):
         """Manually refresh Riot Client status"""
-        self.update_riot_status()
+        self.riot_client.process_tracker.invalidate()  # force a full process rescan
+        self.update_riot_status(refresh_session=True)
         self.statusBar().showMessage("Status refreshed", 2000)
         
     def backup_session(self):
@@ -548,36 +776,40 @@ class MainWindow(QMainWindow):
             target_account = accounts[selected_index]
             full_account = self.account_manager.get_account(target_account['id'])
         
-        try:
-            self.statusBar().showMessage("Creating session backup...", 0)
-            success = self.riot_client.backup_account_session(full_account)
+        self.statusBar().showMessage("Creating session backup...", 0)
+        self.run_session_task(lambda: self.riot_client.backup_account_session(full_account),
+                              lambda success: self.on_backup_finished(full_account, success),
+                              lambda e: self.on_session_task_failed("backup session", "Backup failed", e))
+        
+    def on_backup_finished(self, full_account, success):
+        """Report a backup started by backup_session"""
+        if success:
+            stats = self.riot_client.last_backup_stats
+            full_size, full_count = stats['profile_usage']['full']
+            QMessageBox.information(
+                self, 
+                "Session Backed Up!", 
+                f"✅ Session successfully backed up for {full_account['display_name']}!\n\n"
+                f"Captured {stats['files']} of {full_count} files "
+                f"({round(stats['bytes'] / 1024, 1)} of {round(full_size / 1024, 1)} KB, "
+                f"'{stats['profile']}' profile).\n\n"
+                "This account can now be switched to automatically.\n"
+                "The session will persist as long as 'Stay logged in' was checked."
+            )
+            self.statusBar().showMessage(f"Session backed up for {full_account['display_name']}", 5000)
             
-            if success:
-                QMessageBox.information(
-                    self, 
-                    "Session Backed Up!", 
-                    f"✅ Session successfully backed up for {full_account['display_name']}!\n\n"
-                    "This account can now be switched to automatically.\n"
-                    "The session will persist as long as 'Stay logged in' was checked."
-                )
-                self.statusBar().showMessage(f"Session backed up for {full_account['display_name']}", 5000)
-                
-                # Mark account as used and refresh
-                self.account_manager.mark_account_used(full_account['id'])
-                self.load_accounts()
-            else:
-                QMessageBox.warning(
-                    self, 
-                    "Backup Failed", 
-                    "Failed to backup session.\n\nMake sure:\n"
-                    "• You're logged into Riot Client\n"
-                    "• 'Stay logged in' was checked\n"
-                    "• The application has file write permissions"
-                )
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to backup session: {str(e)}")
-            self.statusBar().showMessage("Backup failed", 3000)
+            # Mark account as used and refresh
+            self.account_manager.mark_account_used(full_account['id'])
+            self.load_accounts()
+        else:
+            QMessageBox.warning(
+                self, 
+                "Backup Failed", 
+                "Failed to backup session.\n\nMake sure:\n"
+                "• You're logged into Riot Client\n"
+                "• 'Stay logged in' was checked\n"
+                "• The application has file write permissions"
+            )
             
     def force_logout(self):
         """Force logout from current account"""
@@ -589,18 +821,17 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.statusBar().showMessage("Forcing logout...", 0)
-                success = self.riot_client.force_logout()
-                if success:
-                    QMessageBox.information(self, "Success", "Successfully logged out!")
-                    self.statusBar().showMessage("Logged out successfully", 3000)
-                    self.update_riot_status()  # Refresh status
-                else:
-                    QMessageBox.warning(self, "Warning", "Logout completed but some files couldn't be cleared")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to logout: {str(e)}")
-                self.statusBar().showMessage("Logout failed", 3000)
+            self.statusBar().showMessage("Forcing logout...", 0)
+            self.run_session_task(self.riot_client.force_logout, self.on_logout_finished,
+                                  lambda e: self.on_session_task_failed("logout", "Logout failed", e))
+                
+    def on_logout_finished(self, success):
+        if success:
+            QMessageBox.information(self, "Success", "Successfully logged out!")
+            self.statusBar().showMessage("Logged out successfully", 3000)
+            self.update_riot_status(refresh_session=True)  # Refresh status
+        else:
+            QMessageBox.warning(self, "Warning", "Logout completed but some files couldn't be cleared")
                 
     def clear_session(self):
         """Clear session data without closing client"""
@@ -612,17 +843,16 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                self.statusBar().showMessage("Clearing session data...", 0)
-                success = self.riot_client.clear_current_session()
-                if success:
-                    QMessageBox.information(self, "Success", "Session data cleared!")
-                    self.statusBar().showMessage("Session data cleared", 3000)
-                else:
-                    QMessageBox.information(self, "Info", "No session data found to clear")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to clear session: {str(e)}")
-                self.statusBar().showMessage("Clear failed", 3000)
+            self.statusBar().showMessage("Clearing session data...", 0)
+            self.run_session_task(self.riot_client.clear_current_session, self.on_clear_finished,
+                                  lambda e: self.on_session_task_failed("clear session", "Clear failed", e))
+                
+    def on_clear_finished(self, success):
+        if success:
+            QMessageBox.information(self, "Success", "Session data cleared!")
+            self.statusBar().showMessage("Session data cleared", 3000)
+        else:
+            QMessageBox.information(self, "Info", "No session data found to clear")
                 
     def show_login_guide(self):
         """Show login guide for selected account"""
@@ -634,8 +864,7 @@ class MainWindow(QMainWindow):
         account = self.account_manager.get_account(account_id)
         
         # Check if account already has a saved session
-        account_backup_dir = self.riot_client._get_account_backup_path(account['display_name'])
-        has_saved_session = os.path.exists(account_backup_dir)
+        has_saved_session = self.account_manager.get_session(account['display_name']) is not None
         
         if has_saved_session:
             guide_text = f"""🎮 Account: {account['display_name']}
@@ -672,4 +901,29 @@ You can create a fresh session by:
             self,
             f"Login Guide - {account['display_name']}",
             guide_text
-        )
\ No newline at end of file
+        )
+        
+    def show_storage_usage(self):
+        """Show how much disk space the session backups use"""
+        try:
+            usage = self.riot_client.get_storage_usage()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to measure storage: {str(e)}")
+            return
+            
+        def format_size(size_bytes):
+            return f"{size_bytes / (1024*1024):.2f} MB"
+            
+        lines = []
+        for folder, folder_usage in usage.items():
+            lines.append(f"📁 {folder}/ — {format_size(folder_usage['total_bytes'])} "
+                         f"({folder_usage['total_files']} files)")
+            entries = sorted(folder_usage['entries'].items(), key=lambda item: item[1][0], reverse=True)
+            for name, (size_bytes, file_count) in entries[:10]:
+                label = "shared file content" if name == '.objects' else name
+                lines.append(f"    • {label}: {format_size(size_bytes)}")
+            if len(entries) > 10:
+                lines.append(f"    • … {len(entries) - 10} more")
+            lines.append("")
+            
+        QMessageBox.information(self, "Storage Usage", "\n".join(lines).strip())
\ No newline at end of file
@@ -0,0 +1,71 @@
+import time
+from PyQt6.QtCore import QObject, QEvent, QTimer
+from core.import_timing import import_breakdown, loaded_modules
+
+DEFAULT_BUDGET_MS = 500
+REPORT_TIMEOUT = 10.0
+
+
+class StartupReport(QObject):
+    """Time the GUI start up to the first paint and the first status check
+
+    Installed as an application event filter before the window is shown;
+    prints the report once MainWindow.finish_startup() has run and quits the
+    app with status 1 if the first paint missed the budget or a deferred
+    module was already loaded by then.
+    """
+    def __init__(self, app, window, started, marks, budget_ms=DEFAULT_BUDGET_MS):
+        super().__init__()
+        self.app = app
+        self.window = window
+        self.started = started
+        self.marks = list(marks)  # [(label, perf_counter)] before the event loop
+        self.budget_ms = budget_ms
+        self.first_paint = None
+        self.loaded_at_paint = []
+        self.deadline = time.monotonic() + REPORT_TIMEOUT
+        app.installEventFilter(self)
+        self.poll = QTimer()
+        self.poll.timeout.connect(self.check_done)
+        self.poll.start(10)
+
+    def eventFilter(self, obj, event):
+        if (self.first_paint is None and event.type() == QEvent.Type.Paint
+                and hasattr(obj, 'window') and obj.window() is self.window):
+            self.first_paint = time.perf_counter()
+            self.loaded_at_paint = loaded_modules()
+        return False
+
+    def check_done(self):
+        timed_out = time.monotonic() > self.deadline
+        if not timed_out and (self.first_paint is None or not self.window.startup_finished):
+            return
+        self.poll.stop()
+        self.app.removeEventFilter(self)
+        ok = self.print_report(time.perf_counter())
+        self.app.exit(0 if ok else 1)
+
+    def ms(self, moment):
+        return (moment - self.started) * 1000
+
+    def print_report(self, finished):
+        print("Startup report (ms since main.py started)")
+        for label, moment in self.marks:
+            print(f"  {label:<24}{self.ms(moment):8.1f}")
+        if self.first_paint is None:
+            print(f"  {'first paint':<24}{'never':>8}")
+            ok = False
+        else:
+            paint_ms = self.ms(self.first_paint)
+            ok = paint_ms <= self.budget_ms
+            print(f"  {'first paint':<24}{paint_ms:8.1f}   budget {self.budget_ms} ms: {'ok' if ok else 'EXCEEDED'}")
+        print(f"  {'first status check':<24}{self.ms(finished):8.1f}")
+        if self.loaded_at_paint:
+            print(f"  loaded before first paint: {', '.join(self.loaded_at_paint)} (should load on first use)")
+            ok = False
+
+        total_ms, heaviest = import_breakdown('gui.main_window')
+        print(f"\nCold import of gui.main_window: {total_ms:.1f} ms (fresh interpreter, -X importtime)")
+        for package, package_ms in heaviest:
+            print(f"  {package:<24}{package_ms:8.1f}")
+        return ok
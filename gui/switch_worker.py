@@ -0,0 +1,55 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from core.control_server import RequestQueue
+
+class SwitchBridge(QObject):
+    """Re-emits SwitchScheduler events as Qt signals (delivered on the GUI thread)
+
+    Add an instance as a scheduler listener; it hears about every switch,
+    whether the GUI or the control server asked for it.
+    """
+    queued = pyqtSignal(object)              # SwitchRequest
+    started = pyqtSignal(object)             # SwitchRequest
+    progress = pyqtSignal(object, str, str)  # SwitchRequest, phase, message
+    finished = pyqtSignal(object)            # SwitchRequest
+
+    def __call__(self, event, request, *details):
+        getattr(self, event).emit(request, *details)
+
+
+class SessionTasks(QObject):
+    """Runs backup, logout and clear off the GUI thread, one at a time
+
+    Tasks share a RequestQueue (as the control server's do) and block on
+    RiotClient.operation_lock there instead of in the UI. on_done(result)
+    or on_error(exception) is called back on the GUI thread.
+    """
+    _finished = pyqtSignal(object, object)  # callback, result or exception
+
+    def __init__(self):
+        super().__init__()
+        self.queue = RequestQueue(name='session-tasks')
+        self.pending = 0
+        self._finished.connect(self._deliver)
+
+    def run(self, func, on_done, on_error):
+        self.pending += 1
+
+        def task():
+            try:
+                result = func()
+            except Exception as e:
+                self._finished.emit(on_error, e)
+            else:
+                self._finished.emit(on_done, result)
+        self.queue.submit(task)
+
+    def is_busy(self):
+        return self.pending > 0
+
+    def _deliver(self, callback, value):
+        self.pending -= 1
+        callback(value)
+
+    def stop(self):
+        """Let the queued tasks finish before the account database closes"""
+        self.queue.stop()
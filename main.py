@@ -1,21 +1,40 @@
 import sys
-import os
+import time
+STARTED = time.perf_counter()
+import argparse
 from PyQt6.QtWidgets import QApplication
 from gui.main_window import MainWindow
+IMPORTED = time.perf_counter()
 
 def main():
-    app = QApplication(sys.argv)
-    
+    parser = argparse.ArgumentParser(description="Riot Account Switcher")
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print start-up timings and the heaviest imports, then exit '
+                             '(status 1 if the first paint misses the budget)')
+    parser.add_argument('--startup-budget', type=float, default=None, metavar='MS',
+                        help='first-paint budget for --startup-report in milliseconds (default: 500)')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    app_created = time.perf_counter()
+
     # Set application properties
     app.setApplicationName("Riot Account Switcher")
     app.setApplicationVersion("1.0.0")
     app.setOrganizationName("RiotSwitcher")
-    
+
     # Create main window
     window = MainWindow()
+    window_created = time.perf_counter()
+
+    if args.startup_report:
+        from gui.startup_report import StartupReport, DEFAULT_BUDGET_MS
+        marks = [('imports', IMPORTED), ('QApplication', app_created), ('MainWindow()', window_created)]
+        # Keep a reference: it prints the report and quits once start-up is done
+        report = StartupReport(app, window, STARTED, marks, args.startup_budget or DEFAULT_BUDGET_MS)
     window.show()
-    
+
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
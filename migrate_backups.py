@@ -0,0 +1,32 @@
+import argparse
+import sys
+from core.account_manager import AccountManager
+from core.riot_client import RiotClient
+from core.session_archive import COMPRESSIONS, default_compression
+
+def main():
+    """Convert existing account_backups/ folders to another backup format"""
+    parser = argparse.ArgumentParser(description="Migrate Riot Account Switcher session backups")
+    parser.add_argument('--format', choices=['archive', 'store'], default='archive',
+                        help="target backup format (default: archive)")
+    parser.add_argument('--compression', choices=sorted(COMPRESSIONS),
+                        help=f"archive compression (default: {default_compression()})")
+    args = parser.parse_args()
+    
+    # With the account database attached every converted backup is re-indexed
+    account_manager = AccountManager()
+    riot_client = RiotClient(session_index=account_manager)
+    if account_manager.sessions_index_created:
+        riot_client.rebuild_session_index()
+    print(f"📦 Migrating account backups to '{args.format}' format...")
+    converted, failed = riot_client.migrate_account_backups(args.format, args.compression)
+    
+    for name in converted:
+        print(f"   ✅ {name}")
+    for name in failed:
+        print(f"   ❌ {name}")
+    print(f"Done: {len(converted)} converted, {len(failed)} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+from benchmarks.runner import BenchmarkEnvironment
+from core.account_manager import AccountManager
+
+
+def read_tree(root):
+    """{relative path: content} of every file under root"""
+    tree = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                tree[os.path.relpath(path, root).replace(os.sep, '/')] = f.read()
+    return tree
+
+
+@pytest.fixture
+def env(tmp_path):
+    """A small fake Riot Client folder and data dir; launching the client is a no-op process"""
+    environment = BenchmarkEnvironment(str(tmp_path), scale=0.02)
+    environment.client.launch_command = [sys.executable, '-c', '']
+    yield environment
+    environment.settle()
+
+
+@pytest.fixture
+def indexed_env(env, monkeypatch):
+    """env with both accounts saved in an account database in its data dir (the working directory)"""
+    os.makedirs(env.client.data_dir, exist_ok=True)
+    monkeypatch.chdir(env.client.data_dir)
+    manager = AccountManager()
+    for account in env.accounts:
+        account['id'] = manager.add_account(account['username'], 'password', account['display_name'])
+    env.client.session_index = manager
+    env.prepare_accounts()
+    yield env, manager
+    manager.conn.close()
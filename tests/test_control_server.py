@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from core.control_server import (ControlServer, RpcError, make_handlers, call, UNKNOWN_ACCOUNT, METHOD_NOT_FOUND,
+                                 INVALID_PARAMS, RequestQueue)
+from tests.conftest import read_tree
+from tests.test_switch import session_part
+
+
+@pytest.fixture
+def server(indexed_env, tmp_path):
+    env, manager = indexed_env
+    control = ControlServer(make_handlers(manager, env.client), str(tmp_path / 'c.sock'))
+    control.start()
+    yield env, control.address
+    control.stop()
+
+
+def test_list_and_ping(server):
+    env, address = server
+    assert call(address, 'ping', timeout=5)['pid']
+    accounts = call(address, 'list', timeout=5)
+    assert [account['display_name'] for account in accounts] == ['Bench Alice', 'Bench Bob']
+    assert all(account['has_session'] for account in accounts)
+
+
+def test_switch_over_socket(server):
+    env, address = server
+    bob = read_tree(env.live_dir)
+    env.generate(0)
+    result = call(address, 'switch', {'account': 'bench_bob'}, timeout=30)
+    assert result['ok'] and result['status'] == 'done'
+    assert session_part(read_tree(env.live_dir)) == session_part(bob)
+
+
+def test_errors(server):
+    env, address = server
+    with pytest.raises(RpcError) as error:
+        call(address, 'switch', {'account': 'nobody'}, timeout=5)
+    assert error.value.code == UNKNOWN_ACCOUNT
+    with pytest.raises(RpcError) as error:
+        call(address, 'explode', timeout=5)
+    assert error.value.code == METHOD_NOT_FOUND
+    for timeout in ('5', 0, -1, True):
+        with pytest.raises(RpcError) as error:
+            call(address, 'switch', {'account': 'bench_bob', 'timeout': timeout}, timeout=5)
+        assert error.value.code == INVALID_PARAMS
+    assert call(address, 'metrics', timeout=5)['in_flight'] == 0
+
+
+def test_request_queue_stop_waits_for_queued_work():
+    queue = RequestQueue(name='test-requests')
+    finished = []
+    for index in range(3):
+        queue.submit(lambda index=index: (time.sleep(0.05), finished.append(index)))
+    assert queue.stop(timeout=5)
+    assert finished == [0, 1, 2]
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import migrate_backups
+
+
+def test_migration_updates_index(indexed_env, monkeypatch):
+    env, manager = indexed_env
+    assert manager.get_session('Bench Alice')['backup_format'] == 'store'
+
+    monkeypatch.setattr(sys, 'argv', ['migrate_backups.py', '--format', 'archive'])
+    assert migrate_backups.main() == 0
+
+    for account in env.accounts:
+        session = manager.get_session(account['display_name'])
+        assert session['backup_format'] == 'archive'
+        assert session['size_bytes'] > 0
+
+
+def test_delete_account_backup_removes_index_row(indexed_env):
+    env, manager = indexed_env
+    assert env.client.delete_account_backup('Bench Alice')
+    assert manager.get_session('Bench Alice') is None
+    assert not os.path.exists(env.client._get_account_backup_path('Bench Alice'))
+    assert manager.get_session('Bench Bob') is not None
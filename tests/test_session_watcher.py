@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+import pytest
+
+from core.session_watcher import SessionWatcher, InotifyWatcher, create_session_watcher
+from core.session_swap import STAGING_PREFIX
+from core.trash import TRASH_DIR_NAME
+
+
+def test_base_watcher_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        SessionWatcher(str(tmp_path), lambda: None)
+
+
+@pytest.mark.skipif(not InotifyWatcher.is_supported(), reason="inotify is Linux only")
+def test_own_trash_and_staging_churn_is_ignored(tmp_path):
+    live = tmp_path / 'Riot Client'
+    (live / 'Data').mkdir(parents=True)
+    changed = threading.Event()
+    watcher = create_session_watcher(str(tmp_path), changed.set, debounce=0.05)
+    assert watcher.backend == 'inotify'
+    watcher.start()
+    try:
+        deadline = time.monotonic() + 5
+        while len(watcher._watches) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)  # armed on the watcher's thread
+        (tmp_path / TRASH_DIR_NAME).mkdir()
+        (tmp_path / TRASH_DIR_NAME / 'item').write_text('x')
+        staging = tmp_path / f'{STAGING_PREFIX}0000'
+        staging.mkdir()
+        os.rename(staging, tmp_path / f'{STAGING_PREFIX}0000-old')
+        assert not changed.wait(0.5)
+
+        (live / 'Data' / 'RiotGamesPrivateSettings.yaml').write_text('username: a\n')
+        assert changed.wait(5)
+    finally:
+        watcher.stop()
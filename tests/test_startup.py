@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.import_timing import PROJECT_ROOT, deferred_after_import, import_breakdown
+
+# Generous compared to the ~60 ms measured, so only a real regression fails
+HEADLESS_IMPORT_BUDGET_MS = 250
+FIRST_PAINT_BUDGET_MS = 1500
+
+
+@pytest.mark.parametrize('module', ['cli', 'core.riot_client', 'core.control_server', 'core.account_manager'])
+def test_headless_imports_defer_heavy_modules(module):
+    assert deferred_after_import(module) == []
+
+
+def test_headless_import_within_budget():
+    total_ms, heaviest = import_breakdown('cli')
+    assert 0 < total_ms <= HEADLESS_IMPORT_BUDGET_MS, heaviest
+
+
+def test_gui_first_paint_within_budget(tmp_path):
+    pytest.importorskip('PyQt6.QtWidgets')
+    environment = dict(os.environ, QT_QPA_PLATFORM='offscreen', PYTHONPATH=PROJECT_ROOT)
+    # The report exits 1 if the first paint misses the budget or a deferred module was loaded by then
+    result = subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, 'main.py'), '--startup-report',
+                             '--startup-budget', str(FIRST_PAINT_BUDGET_MS)],
+                            cwd=tmp_path, env=environment, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert 'budget' in result.stdout and 'loaded before first paint' not in result.stdout
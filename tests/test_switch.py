@@ -0,0 +1,98 @@
+import os
+import threading
+
+import pytest
+
+from core.capture_profiles import get_profile
+from tests.conftest import read_tree
+
+# Outside the 'minimal' profile but not disposable: a switch must keep them
+SHARED_PATHS = ('Data/RiotClientInstalls.json', 'Plugins/rcp-fe-common-libs/')
+
+
+def session_part(tree, profile='minimal'):
+    profile = get_profile(profile)
+    return {rel_path: data for rel_path, data in tree.items() if profile.matches(rel_path)}
+
+
+@pytest.mark.parametrize('mode', ['swap', 'sync', 'replace'])
+def test_switch_round_trip_restores_each_session(env, mode):
+    env.client.restore_mode = mode
+    env.prepare_accounts()
+    bob = read_tree(env.live_dir)
+    env.generate(0)
+    alice = read_tree(env.live_dir)
+
+    assert env.client.switch_account(env.accounts[1])
+    live = read_tree(env.live_dir)
+    assert session_part(live) == session_part(bob)
+    for shared in SHARED_PATHS:
+        kept = {rel_path: data for rel_path, data in alice.items() if rel_path.startswith(shared)}
+        assert kept and all(live.get(rel_path) == data for rel_path, data in kept.items())
+    assert not any(rel_path.startswith('Data/Cache/') for rel_path in live)
+
+    assert env.client.switch_account(env.accounts[0])
+    assert session_part(read_tree(env.live_dir)) == session_part(alice)
+
+
+def test_switch_without_saved_session_logs_out(env):
+    env.generate(0)
+    assert env.client.switch_account({'username': 'carol', 'display_name': 'Carol'})
+    assert not env.client.is_logged_in()
+    assert 'Data/RiotClientInstalls.json' not in read_tree(env.live_dir)
+
+
+@pytest.mark.parametrize('backup_format', ['store', 'archive'])
+@pytest.mark.parametrize('profile', ['minimal', 'full'])
+def test_backup_formats_and_profiles_round_trip(env, backup_format, profile):
+    env.client.backup_format = backup_format
+    env.client.capture_profile = profile
+    env.prepare_accounts()
+    bob = read_tree(env.live_dir)
+    env.generate(0)
+
+    assert env.client.switch_account(env.accounts[1])
+    assert env.client.get_backup_format(env.client._get_account_backup_path('Bench Bob')) == backup_format
+    assert session_part(read_tree(env.live_dir), profile) == session_part(bob, profile)
+
+
+def test_store_deduplicates_unchanged_content(env):
+    env.generate(0)
+    store = env.client.account_store
+    one, two = os.path.join(store.root, 'one'), os.path.join(store.root, 'two')
+    first = store.write_snapshot(env.live_dir, one, get_profile('full'))
+    second = store.write_snapshot(env.live_dir, two, get_profile('full'))
+    assert first['new_bytes'] > 0
+    assert second['new_bytes'] == 0
+    assert store.snapshot_entries(one)[0].keys() == store.snapshot_entries(two)[0].keys()
+
+
+def test_clear_waits_for_running_operation(env):
+    env.generate(0)
+    cleared = threading.Event()
+    with env.client.operation_lock:
+        worker = threading.Thread(target=lambda: (env.client.clear_current_session(), cleared.set()))
+        worker.start()
+        assert not cleared.wait(0.2)
+        assert env.client.is_logged_in()
+    worker.join(5)
+    assert cleared.is_set() and not env.client.is_logged_in()
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink') or os.name == 'nt', reason="needs POSIX symlinks")
+def test_swap_keeps_symlinks(env, tmp_path):
+    env.prepare_accounts()
+    env.generate(0)
+    outside = tmp_path / 'shared-plugins'
+    (outside / 'lib').mkdir(parents=True)
+    (outside / 'lib' / 'plugin.dat').write_bytes(b'plugin')
+    os.symlink(outside, os.path.join(env.live_dir, 'Plugins', 'linked-plugin'))
+    os.symlink('RiotClientInstalls.json', os.path.join(env.live_dir, 'Data', 'installs-link.json'))
+
+    env.client.restore_mode = 'swap'
+    assert env.client.switch_account(env.accounts[1])
+    linked_dir = os.path.join(env.live_dir, 'Plugins', 'linked-plugin')
+    linked_file = os.path.join(env.live_dir, 'Data', 'installs-link.json')
+    assert os.path.islink(linked_dir) and os.readlink(linked_dir) == str(outside)
+    assert os.path.islink(linked_file) and os.readlink(linked_file) == 'RiotClientInstalls.json'
+    assert (outside / 'lib' / 'plugin.dat').read_bytes() == b'plugin'
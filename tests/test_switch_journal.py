@@ -0,0 +1,129 @@
+import json
+import os
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+from core.switch_journal import SwitchJournal
+from tests.conftest import read_tree
+from tests.test_switch import session_part
+
+
+class Crash(BaseException):
+    """Stands in for the app dying: not caught by switch_account"""
+
+
+def crash_during_restore(env, monkeypatch, target):
+    """Run a switch to target that dies in restore_session, as a process that has exited"""
+    def crash(*args, **kwargs):
+        raise Crash()
+    with monkeypatch.context() as patch:
+        patch.setattr(env.client, 'restore_session', crash)
+        with pytest.raises(Crash):
+            env.client.switch_account(target)
+    env.client.journal.close()
+    rewrite_owner(env.client.journal, pid=2 ** 22 + 1, pid_started=0.0)
+
+
+def rewrite_owner(journal, **fields):
+    lines = open(journal.path, encoding='utf-8').read().splitlines()
+    begin = json.loads(lines[0])
+    begin.update(fields)
+    lines[0] = json.dumps(begin)
+    with open(journal.path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def test_torn_last_line_is_ignored_and_cut_off(tmp_path):
+    journal = SwitchJournal(str(tmp_path / 'journal.jsonl'))
+    journal.begin(account='A')
+    journal.record('phase', phase='clear')
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "pha')
+    assert [record['event'] for record in journal.incomplete()] == ['begin', 'phase']
+
+    journal.end('recovered')
+    assert journal.incomplete() is None
+    assert journal.read()[-1]['outcome'] == 'recovered'
+
+
+def test_owner_alive_needs_matching_start_time(tmp_path):
+    journal = SwitchJournal(str(tmp_path / 'journal.jsonl'))
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        started = psutil.Process(child.pid).create_time()
+        assert journal.owner_alive([{'event': 'begin', 'pid': child.pid, 'pid_started': started}])
+        # Same pid, different process (reused after a reboot or wraparound)
+        assert not journal.owner_alive([{'event': 'begin', 'pid': child.pid, 'pid_started': started - 60}])
+        assert not journal.owner_alive([{'event': 'begin', 'pid': child.pid}])
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_begin_refuses_while_owner_alive(tmp_path):
+    journal = SwitchJournal(str(tmp_path / 'journal.jsonl'))
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        journal.begin(account='A')
+        journal.close()
+        rewrite_owner(journal, pid=child.pid, pid_started=psutil.Process(child.pid).create_time())
+        with pytest.raises(RuntimeError):
+            journal.begin(account='B')
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_recovery_rolls_forward(env, monkeypatch):
+    env.prepare_accounts()
+    bob = read_tree(env.live_dir)
+    env.generate(0)
+    crash_during_restore(env, monkeypatch, env.accounts[1])
+
+    recovery = env.client.recover_interrupted_switch()
+    assert recovery == {'action': 'rolled_forward', 'account': 'Bench Bob', 'phase': 'restore'}
+    assert session_part(read_tree(env.live_dir)) == session_part(bob)
+    assert env.client.recover_interrupted_switch() is None
+
+
+def test_recovery_rolls_back_to_pre_switch_snapshot(env, monkeypatch):
+    env.prepare_accounts()
+    env.generate(0)
+    alice = read_tree(env.live_dir)
+    crash_during_restore(env, monkeypatch, env.accounts[1])
+    bob_dir = env.client._get_account_backup_path('Bench Bob')
+    os.rename(bob_dir, bob_dir + '.gone')
+
+    assert env.client.recover_interrupted_switch()['action'] == 'rolled_back'
+    assert session_part(read_tree(env.live_dir)) == session_part(alice)
+
+
+def test_stale_journal_does_not_block_switching(env, monkeypatch):
+    env.prepare_accounts()
+    env.generate(0)
+    crash_during_restore(env, monkeypatch, env.accounts[1])
+    # The crashed switch's pid now belongs to an unrelated live process
+    rewrite_owner(env.client.journal, pid=os.getppid(), pid_started=0.0)
+
+    assert env.client.switch_account(env.accounts[0])
+    assert env.client.journal.read()[-1]['outcome'] == 'done'
+
+
+def test_cancel_after_clear_still_restores(env):
+    env.prepare_accounts()
+    bob = read_tree(env.live_dir)
+    env.generate(0)
+    phases = []
+
+    def progress(phase, message):
+        phases.append(phase)
+
+    assert not env.client.switch_account(env.accounts[1], progress_callback=progress,
+                                         cancel_check=lambda: 'clear' in phases)
+    assert phases == ['clear', 'restore']
+    assert session_part(read_tree(env.live_dir)) == session_part(bob)
+    assert env.client.journal.read()[-1]['outcome'] == 'cancelled'
@@ -0,0 +1,145 @@
+import threading
+import time
+
+from core.switch_scheduler import SwitchScheduler
+
+
+class FakeInstrumentation:
+    def last_trace(self, name):
+        return None
+
+
+class GatedSwitcher:
+    """Stands in for RiotClient: each switch runs until released or cancelled"""
+    def __init__(self):
+        self.instrumentation = FakeInstrumentation()
+        self.switched = []
+        self.running = threading.Event()
+        self.release = threading.Event()
+
+    def switch_account(self, account, progress_callback=None, cancel_check=None):
+        self.switched.append(account['display_name'])
+        progress_callback('clear', "Clearing session data...")
+        self.running.set()
+        while not cancel_check() and not self.release.wait(0.005):
+            pass
+        # Like a real switch, a cancel seen at the next phase boundary wins
+        return not cancel_check()
+
+
+def account(name):
+    return {'display_name': name, 'username': name.lower()}
+
+
+def start_blocked_switch(scheduler, switcher, name):
+    request = scheduler.request(account(name), source='test')
+    assert switcher.running.wait(5)
+    switcher.running.clear()
+    return request
+
+
+def test_burst_coalesces_into_latest_account():
+    switcher = GatedSwitcher()
+    scheduler = SwitchScheduler(switcher)
+    first = start_blocked_switch(scheduler, switcher, 'A')
+    second = scheduler.request(account('B'), source='gui')
+    third = scheduler.request(account('C'), source='control')
+    assert third is second
+    assert second.sources == ['gui', 'control']
+
+    switcher.release.set()
+    assert first.wait(5).status == 'cancelled'
+    assert second.wait(5).status == 'done'
+    assert switcher.switched == ['A', 'C']
+    metrics = scheduler.metrics()
+    assert (metrics['requested'], metrics['coalesced'], metrics['preempted']) == (3, 1, 1)
+    scheduler.stop()
+
+
+def test_request_for_running_account_joins_it():
+    switcher = GatedSwitcher()
+    scheduler = SwitchScheduler(switcher)
+    first = start_blocked_switch(scheduler, switcher, 'A')
+    assert scheduler.request(account('A'), source='control') is first
+    switcher.release.set()
+    assert first.wait(5).status == 'done'
+    assert first.sources == ['test', 'control']
+    assert switcher.switched == ['A']
+    scheduler.stop()
+
+
+def test_cancel_stops_running_and_queued():
+    switcher = GatedSwitcher()
+    scheduler = SwitchScheduler(switcher, preempt=False)
+    running = start_blocked_switch(scheduler, switcher, 'A')
+    queued = scheduler.request(account('B'))
+    assert scheduler.cancel() == 2
+    assert running.wait(5).status == 'cancelled'
+    assert queued.wait(5).status == 'cancelled'
+    assert switcher.switched == ['A']
+    assert not scheduler.is_busy()
+    scheduler.stop()
+
+
+def test_deadline_times_out_switch():
+    switcher = GatedSwitcher()
+    scheduler = SwitchScheduler(switcher)
+    started = time.monotonic()
+    request = scheduler.request(account('A'), timeout=0.05)
+    assert request.wait(5).status == 'timed_out'
+    assert time.monotonic() - started < 2
+    assert scheduler.metrics()['timed_out'] == 1
+    scheduler.stop()
+
+
+def test_listeners_hear_every_event():
+    switcher = GatedSwitcher()
+    switcher.release.set()
+    scheduler = SwitchScheduler(switcher)
+    events = []
+    scheduler.add_listener(lambda event, request, *details: events.append((event,) + details))
+    scheduler.request(account('A')).wait(5)
+    assert events == [('queued',), ('started',), ('progress', 'clear', "Clearing session data..."), ('finished',)]
+    scheduler.stop()
+
+
+def test_worker_survives_a_broken_request():
+    switcher = GatedSwitcher()
+    switcher.release.set()
+    scheduler = SwitchScheduler(switcher)
+    broken = scheduler.request(account('A'), timeout='5')
+    assert broken.wait(5).status == 'error'
+    assert 'TypeError' in broken.error
+    assert not scheduler.is_busy()
+    assert scheduler.request(account('B')).wait(5).status == 'done'
+    scheduler.stop()
+
+
+def test_failing_account_update_keeps_switch_done():
+    class BrokenAccounts:
+        def mark_account_used(self, account_id):
+            raise RuntimeError("database is closed")
+
+    switcher = GatedSwitcher()
+    switcher.release.set()
+    scheduler = SwitchScheduler(switcher, BrokenAccounts())
+    request = scheduler.request(dict(account('A'), id='a'))
+    assert request.wait(5).status == 'done'
+    assert not scheduler.is_busy()
+    scheduler.stop()
+
+
+def test_stop_waits_for_running_switch():
+    class UncancellableSwitcher(GatedSwitcher):
+        def switch_account(self, account, progress_callback=None, cancel_check=None):
+            self.switched.append(account['display_name'])
+            self.running.set()
+            time.sleep(0.2)  # e.g. a restore, which is never cut short
+            return True
+
+    switcher = UncancellableSwitcher()
+    scheduler = SwitchScheduler(switcher)
+    request = start_blocked_switch(scheduler, switcher, 'A')
+    assert scheduler.stop(timeout=5)
+    assert request.status == 'done'
+    assert not scheduler.is_busy()